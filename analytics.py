@@ -0,0 +1,127 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class SalesAnalytics:
+    """Columnar line-item table with rollups that are updated as sales arrive"""
+
+    def __init__(self, capacity=4096):
+        self._lock = threading.Lock()
+        self._size = 0
+        self._columns = {
+            'transaction_id': np.empty(capacity, dtype=np.int64),
+            'time': np.empty(capacity, dtype='datetime64[s]'),
+            'item': np.empty(capacity, dtype=np.int32),  # Code into self.item_names
+            'qty': np.empty(capacity, dtype=np.int64),
+            'amount': np.empty(capacity, dtype=np.int64),
+        }
+        self.item_names = []
+        self._item_codes = {}
+
+        # Rollups
+        self.transactions = 0
+        self.revenue = 0
+        self.units = 0
+        self.revenue_by_hour = np.zeros(24, dtype=np.int64)
+        self.revenue_by_day = pd.Series(dtype=np.int64)
+        self.item_qty = np.zeros(0, dtype=np.int64)
+        self.item_revenue = np.zeros(0, dtype=np.int64)
+        self.option_counts = pd.Series(dtype=np.int64)
+
+    def __len__(self):
+        return self._size
+
+    def _code(self, name):
+        code = self._item_codes.get(name)
+        if code is None:
+            code = self._item_codes[name] = len(self.item_names)
+            self.item_names.append(name)
+        return code
+
+    def _reserve(self, extra):
+        capacity = len(self._columns['qty'])
+        if self._size + extra <= capacity:
+            return
+        while capacity < self._size + extra:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def extend(self, transactions):
+        """Add a batch of transaction dicts (from Journal.transactions) and fold them into the rollups"""
+        if not transactions:
+            return
+        with self._lock:
+            # Flatten the batch into line-item arrays
+            tx_times = np.array([t['time'].replace(' ', 'T') for t in transactions], dtype='datetime64[s]')
+            tx_totals = np.array([t['total'] for t in transactions], dtype=np.int64)
+            lines_per_tx = np.array([len(t['items']) for t in transactions], dtype=np.int64)
+            ids = np.repeat(np.array([t['id'] for t in transactions], dtype=np.int64), lines_per_tx)
+            times = np.repeat(tx_times, lines_per_tx)
+            items = [item for t in transactions for item in t['items']]
+            codes = np.array([self._code(item['name']) for item in items], dtype=np.int32)
+            qty = np.array([item['qty'] for item in items], dtype=np.int64)
+            amount = qty * np.array([item['price'] for item in items], dtype=np.int64)
+
+            n = len(items)
+            self._reserve(n)
+            end = self._size + n
+            self._columns['transaction_id'][self._size:end] = ids
+            self._columns['time'][self._size:end] = times
+            self._columns['item'][self._size:end] = codes
+            self._columns['qty'][self._size:end] = qty
+            self._columns['amount'][self._size:end] = amount
+            self._size = end
+
+            # Fold the batch into the rollups with vectorized group-bys
+            self.transactions += len(transactions)
+            self.revenue += int(tx_totals.sum())
+            self.units += int(qty.sum())
+
+            hours = (tx_times - tx_times.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+            np.add.at(self.revenue_by_hour, hours, tx_totals)
+
+            by_day = pd.Series(tx_totals, index=pd.DatetimeIndex(tx_times.astype('datetime64[D]'))).groupby(level=0).sum()
+            self.revenue_by_day = self.revenue_by_day.add(by_day, fill_value=0).astype(np.int64)
+
+            if len(self.item_qty) < len(self.item_names):
+                grow = len(self.item_names) - len(self.item_qty)
+                self.item_qty = np.concatenate([self.item_qty, np.zeros(grow, dtype=np.int64)])
+                self.item_revenue = np.concatenate([self.item_revenue, np.zeros(grow, dtype=np.int64)])
+            self.item_qty += np.bincount(codes, weights=qty, minlength=len(self.item_names)).astype(np.int64)
+            self.item_revenue += np.bincount(codes, weights=amount, minlength=len(self.item_names)).astype(np.int64)
+
+            options = pd.Series([str(t.get('option', 'Manual')) for t in transactions]).value_counts()
+            self.option_counts = self.option_counts.add(options, fill_value=0).astype(np.int64)
+
+    def line_items(self):
+        """The full line-item table as a DataFrame"""
+        with self._lock:
+            n = self._size
+            return pd.DataFrame({
+                'transaction_id': self._columns['transaction_id'][:n],
+                'time': self._columns['time'][:n],
+                'item': pd.Categorical.from_codes(self._columns['item'][:n], categories=self.item_names),
+                'qty': self._columns['qty'][:n],
+                'amount': self._columns['amount'][:n],
+            })
+
+    def top_items(self, limit=10):
+        with self._lock:
+            order = np.argsort(-self.item_revenue, kind='stable')[:limit]
+            return pd.DataFrame({
+                'Item': [self.item_names[i] for i in order],
+                'Qty': self.item_qty[order],
+                'Revenue': self.item_revenue[order],
+            })
+
+    def basket_size(self):
+        """Average units per transaction"""
+        return self.units / self.transactions if self.transactions else 0.0
+
+    def average_ticket(self):
+        return self.revenue / self.transactions if self.transactions else 0.0
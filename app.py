@@ -6,17 +6,39 @@ from google.oauth2.service_account import Credentials
 from streamlit_option_menu import option_menu
 import sys
 import traceback
-from google.auth.transport.requests import Request
 import time
+import cProfile
+import io
+import pstats
+import importlib.util
+import itertools
+from sheet_writer import SheetWriter
+from sheet_reader import SheetReader
+from partitions import SheetPartitions
+from backends import LINE_ITEMS_HEADER, LINE_ITEMS_SHEET, LOG_HEADER, SHEET_NAME
+from backends import CsvBackend, ParquetBackend, SheetsBackend, SqliteBackend, ensure_header
+from fake_sheets import FakeClient
+from journal import Journal
+from sheets_api import SheetsApi, TokenRefresher, service_account_info
+from ledger import TransactionFrame
+from analytics import SalesAnalytics
+from cart import Cart
+from catalogue import MenuCatalogue
+from payments import CHANGE_DENOMINATIONS, DENOMINATIONS, ChangeMaker, format_breakdown, payment_options
+from metrics import Metrics, serve_metrics
+import export
+from reconcile import describe as describe_reconciliation, log_sheets, reconcile
 
 # ===== PRODUCTION CONFIGURATION =====
 PRODUCTION_MODE = True  # Set to False for development mode
 
 def handle_error(message, exception=None):
     """Display user-friendly error messages in production mode"""
+    is_sheets_error = "Google Sheets" in message or "sheet" in message.lower()
+    get_metrics().inc("errors_total", source="sheets" if is_sheets_error else "app")
     if PRODUCTION_MODE:
         # Google Sheets errors are completely hidden in production
-        if "Google Sheets" in message or "sheet" in message.lower():
+        if is_sheets_error:
             # Log internally but don't show to user
             if exception:
                 print(f"INTERNAL ERROR: {message} - {str(exception)}")
@@ -40,21 +62,54 @@ def show_friendly_error():
 sys.excepthook = lambda exc_type, exc_value, exc_traceback: show_friendly_error()
 # ===== END PRODUCTION CONFIGURATION =====
 
+@st.cache_resource
+def get_metrics():
+    """Process-wide counters and latency histograms"""
+    return Metrics()
+
+# Time the whole rerun; recorded at the end of the script, even when it is interrupted
+PROFILE_LINES = 40  # Functions listed in a profile, by cumulative time
+rerun_started = time.perf_counter()
+
+# Local transaction journal (system of record; Google Sheets is a replica)
+JOURNAL_PATH = "pos_journal.db"
+
+@st.cache_resource
+def get_journal():
+    # `server_id` (0-999) in secrets keeps IDs distinct between servers sharing a sheet
+    return Journal(JOURNAL_PATH, server_id=get_setting("server_id", None))
+
+@st.cache_resource
+def get_transaction_frame():
+    """Process-wide columnar transaction history, filled incrementally from the journal"""
+    return TransactionFrame()
+
+@st.cache_resource
+def get_sales_analytics():
+    """Process-wide line-item table and sales rollups"""
+    return SalesAnalytics()
+
+def sync_history():
+    """Pull newly journaled sales into the shared frame and analytics rollups"""
+    frame = get_transaction_frame()
+    if uses_sheets():
+        # First call hydrates a fresh journal from the sheet
+        get_sheet_reader()
+    with get_metrics().span("history_sync"):
+        get_sales_analytics().extend(frame.sync(get_journal()))
+    return frame
+
+@st.cache_resource
+def get_menu_catalogue():
+    """Menu shared by every session and stored next to the journal"""
+    return MenuCatalogue(JOURNAL_PATH)
+
+# Shared menu: one version check per rerun, reload only after an edit
+get_menu_catalogue().sync()
+
 # Initialize session state for data
-if 'menu' not in st.session_state:
-    st.session_state.menu = [
-        {'id': 1, 'name': 'Fried Rice', 'price': 15000},
-        {'id': 2, 'name': 'Fried Noodles', 'price': 12000},
-        {'id': 3, 'name': 'Fried Chicken', 'price': 18000},
-        {'id': 4, 'name': 'Iced Tea', 'price': 5000},
-        {'id': 5, 'name': 'Orange Juice', 'price': 6000},
-    ]
-    
-if 'transactions' not in st.session_state:
-    st.session_state.transactions = []
-    
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
+    st.session_state.cart = Cart()
 
 if 'amount_paid' not in st.session_state:
     st.session_state.amount_paid = 0
@@ -63,142 +118,277 @@ if 'payment_options' not in st.session_state:
     st.session_state.payment_options = []
 
 # Google Sheets setup
-SHEET_NAME = "POS_Transaction_Log"
+SHEET_KEY = None  # Spreadsheet key; overridden by `sheet_key` in secrets
+SHEETS_REQUESTS_PER_MINUTE = 60  # Overridden by `sheets_requests_per_minute` in secrets
+# Where the journal is replicated: "sheets", "fake" (in-memory Sheets), "sqlite", "csv" or "parquet"
+LOG_BACKEND = "sheets"  # Overridden by `log_backend` in secrets
+LOG_PATH = "pos_log"  # File or directory for the sqlite/csv/parquet backends; `log_path` in secrets
+SHEET_PARTITION = "month"  # Log tab per "day", "month" or "year", or "none" for sheet1 only; `sheet_partition` in secrets
+SHEET_REFRESH_INTERVAL = 60  # Seconds between reads of rows other servers logged; `sheet_refresh_interval` in secrets
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
 ]
 
-def validate_credentials(credentials_dict):
-    """Validasi kredensial Google sebelum digunakan"""
-    try:
-        # Coba buat credentials
-        creds = Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=SCOPES
-        )
-        
-        # Refresh token untuk memvalidasi
-        if creds.expired:
-            creds.refresh(Request())
-            
-        return True, "Credentials valid"
-    except Exception as e:
-        return False, f"Invalid credentials: {str(e)}"
+@st.cache_resource
+def get_google_credentials():
+    """Build the service account credentials once per process; their token is refreshed in the background"""
+    # Get credentials from secrets; the private key is cleaned up on the way
+    credentials_dict = service_account_info(st.secrets["gcp_service_account"])
+    
+    # Single construction; a malformed key raises here. The first token is fetched
+    # by the refresher thread, not by whoever happens to make the first request
+    creds = Credentials.from_service_account_info(
+        credentials_dict,
+        scopes=SCOPES
+    )
+    return TokenRefresher(creds, metrics=get_metrics())
+
+@st.cache_resource
+def get_gspread_client():
+    """Long-lived client sharing the refreshed credentials"""
+    return gspread.authorize(get_google_credentials().credentials)
 
-@st.cache_resource(ttl=300)
 def get_google_sheets_connection():
     try:
         # Check if secrets are available
         if 'gcp_service_account' not in st.secrets:
             handle_error("Google Sheets credentials not found")
             return None
-        
-        # Get credentials from secrets
-        sa_info = st.secrets["gcp_service_account"]
-        
-        # Clean private key
-        private_key = sa_info['private_key']
-        
-        # Perbaikan khusus untuk masalah JWT Signature:
-        # 1. Pastikan tidak ada spasi tambahan
-        private_key = private_key.strip()
-        
-        # 2. Ganti semua \\n dengan newline sebenarnya
-        private_key = private_key.replace('\\n', '\n')
-        
-        # 3. Hilangkan kutipan tambahan jika ada
-        if private_key.startswith('"') and private_key.endswith('"'):
-            private_key = private_key[1:-1]
-        
-        # Create credentials dictionary
-        credentials_dict = {
-            "type": sa_info["type"],
-            "project_id": sa_info["project_id"],
-            "private_key_id": sa_info["private_key_id"],
-            "private_key": private_key,
-            "client_email": sa_info["client_email"],
-            "client_id": sa_info["client_id"],
-            "auth_uri": sa_info["auth_uri"],
-            "token_uri": sa_info["token_uri"],
-            "auth_provider_x509_cert_url": sa_info["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": sa_info["client_x509_cert_url"]
-        }
-        
-        # Validasi kredensial sebelum digunakan
-        valid, msg = validate_credentials(credentials_dict)
-        if not valid:
-            handle_error(f"Invalid Google Sheets credentials: {msg}")
-            return None
-        
-        # Create credentials
-        creds = Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=SCOPES
-        )
-        
-        # Authorize gspread
-        client = gspread.authorize(creds)
-        return client
+        return get_gspread_client()
+    except ValueError as e:
+        handle_error("Invalid Google Sheets credentials", e)
+        return None
     except Exception as e:
         handle_error("Google Sheets connection error", e)
         return None
             
-def get_sheet():
+def get_setting(name, default):
+    """Read an optional top-level setting from secrets"""
     try:
-        client = get_google_sheets_connection()
-        if not client:
-            return None
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+@st.cache_resource
+def get_sheets_api():
+    """Process-wide request budget shared by every session"""
+    return SheetsApi(
+        requests_per_minute=int(get_setting("sheets_requests_per_minute", SHEETS_REQUESTS_PER_MINUTE)),
+        metrics=get_metrics()
+    )
+
+@st.cache_resource
+def start_metrics_endpoint(port):
+    """Serve /metrics in Prometheus text format, once per process"""
+    return serve_metrics(get_metrics(), port)
+
+@st.cache_resource
+def get_fake_client():
+    """Offline stand-in for Google Sheets with configurable latency and 429 rate"""
+    return FakeClient(
+        latency=float(get_setting("fake_sheets_latency", 0.0)),
+        error_rate=float(get_setting("fake_sheets_error_rate", 0.0))
+    )
+
+def get_sheets_client():
+    if get_setting("log_backend", LOG_BACKEND) == "fake":
+        return get_fake_client()
+    return get_google_sheets_connection()
+
+@st.cache_resource
+def get_worksheet():
+    """Resolve the log worksheet once per process; raises so failures are not cached"""
+    client = get_sheets_client()
+    if not client:
+        raise RuntimeError("No Google Sheets connection")
+    
+    # Open by key: a single metadata call, no Drive search
+    sheet_key = get_setting("sheet_key", SHEET_KEY)
+    if sheet_key:
+        with get_metrics().span("sheets_open", method="key"):
+            return get_sheets_api().call(client.open_by_key, sheet_key).sheet1
+    
+    # Fallback when no key is configured: search by title once
+    api = get_sheets_api()
+    sa_info = get_setting("gcp_service_account", None)  # None when the client needs no credentials
+    try:
+        with get_metrics().span("sheets_open", method="search"):
+            spreadsheet = api.call(client.open, SHEET_NAME)
+    except gspread.SpreadsheetNotFound:
+        # Create new spreadsheet
+        spreadsheet = api.call(client.create, SHEET_NAME)
         
-        # Try to open existing sheet
-        try:
-            return client.open(SHEET_NAME).sheet1
-        except gspread.SpreadsheetNotFound:
-            # Create new spreadsheet
-            spreadsheet = client.create(SHEET_NAME)
-            
+        if sa_info:
             # Share with service account
-            sa_info = st.secrets["gcp_service_account"]
-            spreadsheet.share(sa_info['client_email'], perm_type='user', role='writer')
+            api.call(spreadsheet.share, sa_info['client_email'], perm_type='user', role='writer')
             
             # Tunggu sebentar agar spreadsheet benar-benar terbentuk
             time.sleep(2)
-            
-            sheet = spreadsheet.sheet1
-            
-            # Add headers
-            sheet.append_row([
-                "Transaction ID", "Timestamp", "Total Amount", 
-                "Option 1", "Option 2", "Option 3", 
-                "Amount Paid", "Selected Option", "Items"
-            ])
-            
-            return sheet
-        except gspread.exceptions.APIError as api_err:
-            # Tangani error API secara khusus
-            handle_error(f"Google Sheets API error: {api_err.response.text}")
-            return None
+    
+    # Add headers; a no-op once written, so a retry after a failed call above is safe
+    ensure_header(spreadsheet.sheet1, LOG_HEADER, api)
+    
+    if sa_info:
+        print(f"INFO: set sheet_key = \"{spreadsheet.id}\" in secrets to skip the Drive search for '{SHEET_NAME}'")
+    return spreadsheet.sheet1
+
+@st.cache_resource
+def get_line_items_worksheet():
+    """Normalized line-item tab next to the transaction log"""
+    spreadsheet = get_worksheet().spreadsheet
+    api = get_sheets_api()
+    try:
+        sheet = api.call(spreadsheet.worksheet, LINE_ITEMS_SHEET)
+    except gspread.WorksheetNotFound:
+        sheet = api.call(spreadsheet.add_worksheet, LINE_ITEMS_SHEET, rows=1000, cols=4)
+    # Also repairs a tab whose header write failed after it was added
+    ensure_header(sheet, LINE_ITEMS_HEADER, api)
+    return sheet
+
+def get_line_sheet():
+    try:
+        return get_line_items_worksheet()
+    except Exception as e:
+        handle_error("Failed to access line items sheet", e)
+        return None
+
+def get_sheet():
+    try:
+        return get_worksheet()
+    except gspread.exceptions.APIError as api_err:
+        # Tangani error API secara khusus
+        handle_error(f"Google Sheets API error: {api_err.response.text}")
+        return None
     except Exception as e:
         handle_error("Failed to access sheet", e)
         return None
 
+def invalidate_sheet(exception):
+    """Drop the cached worksheet when the sheet is gone or access was revoked"""
+    partitions = get_sheet_partitions()
+    if isinstance(exception, (gspread.SpreadsheetNotFound, gspread.WorksheetNotFound)):
+        get_worksheet.clear()
+        get_line_items_worksheet.clear()
+        if partitions:
+            partitions.invalidate()
+    elif isinstance(exception, gspread.exceptions.APIError):
+        if exception.response.status_code in (401, 403, 404):
+            get_worksheet.clear()
+            get_line_items_worksheet.clear()
+        if partitions and exception.response.status_code in (400, 401, 403, 404):
+            # 400: a partition tab was deleted and its sheetId is no longer valid
+            partitions.invalidate()
+        if exception.response.status_code == 401 and get_setting("log_backend", LOG_BACKEND) == "sheets":
+            # Token rejected early (e.g. revoked); fetch a new one instead of waiting for expiry
+            get_google_credentials().refresh_soon()
+
+@st.cache_resource
+def get_sheet_partitions():
+    """Per-period log tabs, or None when `sheet_partition` is "none" (everything in sheet1)"""
+    granularity = get_setting("sheet_partition", SHEET_PARTITION)
+    if granularity == "none":
+        return None
+    return SheetPartitions(lambda: get_worksheet().spreadsheet, api=get_sheets_api(), granularity=granularity)
+
+@st.cache_resource
+def get_log_backend():
+    """Process-wide destination for the transaction log, chosen by `log_backend`"""
+    kind = get_setting("log_backend", LOG_BACKEND)
+    path = get_setting("log_path", LOG_PATH)
+    if kind == "sqlite":
+        return SqliteBackend(path if path.endswith(".db") else f"{path}.db")
+    if kind == "csv":
+        return CsvBackend(path)
+    if kind == "parquet":
+        return ParquetBackend(path)
+    backend = SheetsBackend(
+        get_sheet,
+        get_line_sheet=get_line_sheet,
+        api=get_sheets_api(),
+        on_error=invalidate_sheet,
+        partitions=get_sheet_partitions()
+    )
+    if kind == "fake":
+        backend.name = "Fake Sheets"
+    else:
+        # Starts the token refresher now rather than on the first replication
+        get_google_sheets_connection()
+    return backend
+
+@st.cache_resource
+def get_sheet_writer():
+    """Process-wide replicator from the local journal to the log backend"""
+    return SheetWriter(get_journal(), get_log_backend(), metrics=get_metrics())
+
+def uses_sheets():
+    return get_setting("log_backend", LOG_BACKEND) in ("sheets", "fake")
+
+@st.cache_resource(show_spinner="Loading transaction history...")
+def get_sheet_reader():
+    """Process-wide delta reader: hydrates a fresh journal from the sheet, then polls for new rows"""
+    return SheetReader(
+        get_journal(),
+        get_sheet,
+        get_line_sheet=get_line_sheet,
+        catalogue=get_menu_catalogue(),
+        api=get_sheets_api(),
+        interval=float(get_setting("sheet_refresh_interval", SHEET_REFRESH_INTERVAL)),
+        metrics=get_metrics(),
+        partitions=get_sheet_partitions()
+    )
+
+def reconcile_sheet():
+    """Backfill replicated transactions missing from the sheet; pending ones stay with the writer"""
+    sheet = get_sheet()
+    if not sheet:
+        raise RuntimeError("No sheet connection")
+    return reconcile(
+        get_journal(),
+        get_log_backend(),
+        log_sheets(sheet, get_sheet_partitions()),
+        api=get_sheets_api(),
+        metrics=get_metrics()
+    )
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_sheets_status():
+    """Metadata-only health probe; never reads transaction rows"""
+    journal = get_journal()
+    writer = get_sheet_writer()
+    backend = get_log_backend()
+    status = {
+        'backend': backend.name,
+        'connected': False,
+        'title': None,
+        'rows': None,
+        'probe_latency': None,
+        'synced_rows': journal.synced_count(),
+        'queue_depth': writer.depth(),
+        'last_sync': writer.last_sync,
+        'write_latency': writer.last_latency,
+        'last_error': writer.last_error,
+        'throttled': get_sheets_api().throttled,
+    }
+    
+    try:
+        status.update(backend.status())
+    except Exception as e:
+        backend.invalidate(e)
+        status['last_error'] = str(e)
+    return status
+
 def log_transaction(transaction_id, timestamp, total, options, amount_paid, selected_option, items):
     try:
-        # Get sheet connection
-        sheet = get_sheet()
-        if not sheet:
-            return False, "No sheet connection"
-            
         # Format items for logging
-        items_str = "; ".join([f"{item['name']} x {item['qty']}" for item in items])
+        items_str = "; ".join([f"{item.name} x {item.qty}" for item in items])
         
         # Determine selected option
         option_index = "Manual"
         if amount_paid in options:
             option_index = options.index(amount_paid) + 1
         
-        # Add row to Google Sheet
-        sheet.append_row([
+        row = [
             str(transaction_id),
             timestamp,
             str(total),
@@ -208,88 +398,79 @@ def log_transaction(transaction_id, timestamp, total, options, amount_paid, sele
             str(amount_paid),
             str(option_index),
             items_str
-        ])
+        ]
         
-        return True, ""
+        # Durable local write first; the replicator ships it to the sheet later
+        with get_metrics().span("journal_append"):
+            get_journal().append({
+                'id': transaction_id,
+                'time': timestamp,
+                'items': [item._asdict() for item in items],
+                'total': total,
+                'amount_paid': amount_paid,
+                'change': amount_paid - total
+            }, row)
     except Exception as e:
         handle_error("Failed to log transaction", e)
         return False, str(e)
     
-# ENHANCED PAYMENT ALGORITHM WITH PRACTICAL OPTIONS
-def payment_options(total):
-    # Common Indonesian banknotes
-    denominations = [1000, 2000, 5000, 10000, 20000, 50000, 100000]
-    
-    # Phase 1: Generate core options
-    options = []
-    
-    # 1. Minimal convenient amount
-    min_option = next((d for d in denominations if d >= total), total + 1000)
-    options.append(min_option)
-    
-    # 2. Practical large denomination option
-    if total <= 30000:
-        large_option = 50000
-    elif total <= 70000:
-        large_option = 100000
-    else:
-        # Round up to next 50000
-        large_option = ((total // 50000) + 1) * 50000
-    options.append(large_option)
-    
-    # 3. Middle option - psychologically comfortable amount
-    if total < 10000:
-        # Round to nearest 500
-        mid_option = round(total / 500) * 500
-        if mid_option <= total:
-            mid_option += 500
-    elif total < 50000:
-        # Round to nearest 5000
-        mid_option = ((total // 5000) + 1) * 5000
-    else:
-        # Round to nearest 10000
-        mid_option = ((total // 10000) + 1) * 10000
-    options.append(mid_option)
-    
-    # Ensure all options are unique and sorted
-    unique_options = sorted(set(options))
-    
-    # Fill in missing options if we don't have 3 distinct
-    while len(unique_options) < 3:
-        # Add a practical increment
-        if total < 30000:
-            new_option = unique_options[-1] + 5000
-        else:
-            new_option = unique_options[-1] + 10000
-        unique_options.append(new_option)
+    # The sale is recorded from here on; a later failure must not make it look unsaved
+    try:
+        get_sheet_writer().submit()
+        sync_history()
+    except Exception as e:
+        handle_error("Transaction journaled but not yet queued for the sheet", e)
+    return True, ""
     
-    # Return exactly 3 options sorted ascending
-    return sorted(unique_options[:3])
+@st.cache_resource
+def get_change_maker():
+    """Change-making table over the drawer's notes and coins, built once per process"""
+    return ChangeMaker(get_setting("change_denominations", CHANGE_DENOMINATIONS))
 
 # POS Page with enhanced payment options
+MENU_PAGE_SIZE = 16
+
 def pos_page():
     st.header("📊 Point of Sale")
+    order_panel()
+
+# Menu grid, cart and checkout rerun together without the sidebar or other setup
+@st.fragment
+@get_metrics().timed("fragment", fragment="order_panel")
+def order_panel():
+    # Outcome of the last checkout/clear callback
+    if 'checkout_message' in st.session_state:
+        st.success(st.session_state.pop('checkout_message'))
+    if 'checkout_error' in st.session_state:
+        st.error(st.session_state.pop('checkout_error'))
     
     # Display menu in grid format
     st.subheader("Menu")
-    cols = st.columns(4)
-    
-    for i, item in enumerate(st.session_state.menu):
-        with cols[i % 4]:
-            if st.button(f"{item['name']}\nRp {item['price']:,}", key=f"menu_{item['id']}"):
-                # Check if item is already in cart
-                existing_item = next((x for x in st.session_state.cart if x['id'] == item['id']), None)
-                
-                if existing_item:
-                    existing_item['qty'] += 1
-                else:
-                    st.session_state.cart.append({
-                        'id': item['id'],
-                        'name': item['name'],
-                        'price': item['price'],
-                        'qty': 1
-                    })
-                st.success(f"{item['name']} added to cart!")
+    catalogue = get_menu_catalogue()
+    
+    # Only the selected category is rendered (st.tabs would build every tab on each rerun)
+    category = st.segmented_control(
+        "Category", ["All"] + catalogue.categories(), default="All", key="menu_category"
+    )
+    query = st.text_input("Search menu", key="menu_search", placeholder="Type to search...")
+    items = catalogue.search(query, None if category in (None, "All") else category)
+    
+    if not items:
+        st.info("No menu items found")
+    else:
+        # One page of buttons per rerun, independent of catalogue size
+        page_count = (len(items) - 1) // MENU_PAGE_SIZE + 1
+        page = 1
+        if page_count > 1:
+            page = st.number_input("Menu page", min_value=1, max_value=page_count, value=1, step=1)
+        start = (page - 1) * MENU_PAGE_SIZE
+        
+        cols = st.columns(4)
+        for i, item in enumerate(items[start:start + MENU_PAGE_SIZE]):
+            with cols[i % 4]:
+                if st.button(f"{item['name']}\nRp {item['price']:,}", key=f"menu_{item['id']}"):
+                    st.session_state.cart.add(item)
+                    st.success(f"{item['name']} added to cart!")
     
     st.divider()
     
@@ -298,148 +479,176 @@ def pos_page():
     
     if not st.session_state.cart:
         st.info("Cart is empty. Please add items from the menu.")
+        return
+    
+    cart = st.session_state.cart
+    total_price = cart.total
+    lines = list(cart)
+    
+    st.dataframe(
+        pd.DataFrame({
+            'Item': [line.name for line in lines],
+            'Price': [line.price for line in lines],
+            'Qty': [line.qty for line in lines],
+            'Subtotal': [line.price * line.qty for line in lines]
+        }),
+        column_config={
+            "Item": st.column_config.TextColumn("Item", width="medium"),
+            "Price": st.column_config.NumberColumn("Price (Rp)", format="localized", width="small"),
+            "Qty": st.column_config.NumberColumn("Qty", width="small"),
+            "Subtotal": st.column_config.NumberColumn("Subtotal (Rp)", format="localized", width="medium")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    # Per-line adjustments; callbacks run before the next render
+    with st.expander("Adjust items"):
+        for line in lines:
+            col1, col2, col3 = st.columns([4, 1, 1])
+            col1.write(f"{line.name} x {line.qty}")
+            col2.button("➖", key=f"dec_{line.id}", help="Remove one",
+                        on_click=cart.decrement, args=(line.id,))
+            col3.button("✖", key=f"del_{line.id}", help="Remove line",
+                        on_click=cart.remove, args=(line.id,))
+    
+    st.markdown(f"**Total Price: Rp {total_price:,}**")
+    
+    payment_panel(total_price)
+    
+    # Checkout actions run as callbacks, so the cart is already updated when the panel redraws
+    col1, col2, col3 = st.columns(3)
+    col1.button("Complete Transaction", type="primary", use_container_width=True,
+                on_click=complete_transaction)
+    col2.button("Clear Cart", use_container_width=True,
+                on_click=clear_cart, args=("Cart has been cleared",))
+    col3.button("Remove All", use_container_width=True, type="secondary",
+                on_click=clear_cart, args=("All items removed",))
+
+CHECKOUT_FAILED = "Transaction was not saved. The cart was kept, please try again."
+
+def complete_transaction():
+    cart = st.session_state.cart
+    try:
+        transaction_id = get_journal().next_transaction_id()
+    except Exception as e:
+        handle_error("Failed to allocate transaction ID", e)
+        st.session_state.checkout_error = CHECKOUT_FAILED
+        return
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    # Journal locally; replicated to Google Sheets in the background
+    log_success, log_message = log_transaction(
+        transaction_id=transaction_id,
+        timestamp=timestamp,
+        total=cart.total,
+        options=st.session_state.payment_options,
+        amount_paid=st.session_state[AMOUNT_TENDERED_KEY],
+        selected_option=st.session_state.amount_paid,
+        items=cart.freeze()
+    )
+    
+    if log_success:
+        clear_cart("Transaction completed successfully!")
     else:
-        total_price = 0
-        cart_df = []
-        
-        for item in st.session_state.cart:
-            subtotal = item['price'] * item['qty']
-            total_price += subtotal
-            cart_df.append({
-                'Item': item['name'],
-                'Price': f"Rp {item['price']:,}",
-                'Qty': item['qty'],
-                'Subtotal': f"Rp {subtotal:,}"
-            })
-        
-        st.dataframe(
-            pd.DataFrame(cart_df),
-            column_config={
-                "Item": st.column_config.TextColumn("Item", width="medium"),
-                "Price": st.column_config.TextColumn("Price", width="small"),
-                "Qty": st.column_config.NumberColumn("Qty", width="small"),
-                "Subtotal": st.column_config.TextColumn("Subtotal", width="medium")
-            },
-            hide_index=True,
-            use_container_width=True
-        )
-        
-        st.markdown(f"**Total Price: Rp {total_price:,}**")
-        
-        # Generate payment options
-        options = payment_options(total_price)
-        st.session_state.payment_options = options
-        
-        # Payment options section
-        st.subheader("Payment Options")
-        cols = st.columns(3)
-        button_labels = [" ", " ", " "]
-        button_descriptions = [
-            "Most efficient amount",
-            "Comfortable amount",
-            "Large denomination"
-        ]
-        
-        for i, col in enumerate(cols):
-            with col:
-                if st.button(
-                    f"{button_labels[i]}\nRp {options[i]:,}", 
-                    key=f"option{i+1}", 
-                    use_container_width=True,
-                    help=button_descriptions[i]
-                ):
-                    st.session_state.amount_paid = options[i]
-                    st.success(f"Amount set to Rp {options[i]:,}")
-        
-        # Manual input
-        amount_paid = st.number_input(
-            "Amount Paid", 
-            min_value=total_price, 
-            value=st.session_state.amount_paid or total_price,
-            step=1000,
-            format="%d"
-        )
-        
-        change = amount_paid - total_price
-        
-        if change >= 0:
-            st.success(f"Change: Rp {change:,}")
+        # Nothing was recorded: keep the cart so the cashier can retry
+        st.session_state.checkout_error = CHECKOUT_FAILED
+
+def clear_cart(message):
+    st.session_state.cart.clear()
+    st.session_state.amount_paid = 0
+    st.session_state.pop(AMOUNT_TENDERED_KEY, None)
+    st.session_state.checkout_message = message
+
+AMOUNT_TENDERED_KEY = "amount_tendered"  # Session state of the "Amount Paid" input
+
+# Tender selection reruns on its own; the cart above is not rebuilt
+@st.fragment
+@get_metrics().timed("fragment", fragment="payment_panel")
+def payment_panel(total_price):
+    # Generate payment options (memoized per total)
+    options = payment_options(total_price, get_setting("denominations", DENOMINATIONS))
+    st.session_state.payment_options = options
+    
+    # Payment options section
+    st.subheader("Payment Options")
+    cols = st.columns(3)
+    button_labels = [" ", " ", " "]
+    button_descriptions = [
+        "Most efficient amount",
+        "Comfortable amount",
+        "Large denomination"
+    ]
+    
+    for i, col in enumerate(cols):
+        with col:
+            if st.button(
+                f"{button_labels[i]}\nRp {options[i]:,}", 
+                key=f"option{i+1}", 
+                use_container_width=True,
+                help=button_descriptions[i]
+            ):
+                st.session_state.amount_paid = options[i]
+                st.session_state[AMOUNT_TENDERED_KEY] = options[i]
+                st.success(f"Amount set to Rp {options[i]:,}")
+    
+    # Tender that minimizes notes handed over plus notes given back
+    change_maker = get_change_maker()
+    best = change_maker.best_tenders(total_price, options, limit=1)
+    if best:
+        tender, paid_notes, change_notes = best[0]
+        if st.button(
+            f"Fewest notes: Rp {tender:,}",
+            key="option_fewest",
+            help=f"{paid_notes} notes paid, {change_notes} given back"
+        ):
+            st.session_state.amount_paid = tender
+            st.session_state[AMOUNT_TENDERED_KEY] = tender
+            st.success(f"Amount set to Rp {tender:,}")
+    
+    # Manual input; keyed so the checkout callback reads what was typed even
+    # if this fragment has not rerun since
+    if st.session_state.get(AMOUNT_TENDERED_KEY, 0) < total_price:
+        st.session_state[AMOUNT_TENDERED_KEY] = total_price
+    amount_paid = st.number_input(
+        "Amount Paid", 
+        min_value=total_price, 
+        step=1000,
+        format="%d",
+        key=AMOUNT_TENDERED_KEY
+    )
+    
+    change = amount_paid - total_price
+    
+    if change >= 0:
+        pieces = change_maker.breakdown(change)
+        if pieces:
+            st.success(f"Change: Rp {change:,} ({format_breakdown(pieces)})")
         else:
-            st.error(f"Amount insufficient: Rp {-change:,}")
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            if st.button("Complete Transaction", type="primary", use_container_width=True):
-                # Start transaction processing
-                with st.spinner("Processing transaction..."):
-                    # Save transaction locally
-                    transaction_id = len(st.session_state.transactions) + 1
-                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    new_transaction = {
-                        'id': transaction_id,
-                        'time': timestamp,
-                        'items': st.session_state.cart.copy(),
-                        'total': total_price,
-                        'amount_paid': amount_paid,
-                        'change': change
-                    }
-                    
-                    st.session_state.transactions.append(new_transaction)
-                    
-                    # Log to Google Sheets in background
-                    log_success, log_message = log_transaction(
-                        transaction_id=transaction_id,
-                        timestamp=timestamp,
-                        total=total_price,
-                        options=options,
-                        amount_paid=amount_paid,
-                        selected_option=st.session_state.amount_paid,
-                        items=st.session_state.cart
-                    )
-                    
-                    if log_success:
-                        st.success("Transaction completed successfully!")
-                    else:
-                        st.success("Transaction completed!")
-                    
-                    # Reset cart
-                    st.session_state.cart = []
-                    st.session_state.amount_paid = 0
-        with col2:
-            if st.button("Clear Cart", use_container_width=True):
-                st.session_state.cart = []
-                st.session_state.amount_paid = 0
-                st.info("Cart has been cleared")
-        with col3:
-            if st.button("Remove All", use_container_width=True, type="secondary"):
-                st.session_state.cart = []
-                st.session_state.amount_paid = 0
-                st.info("All items removed")
+            st.success(f"Change: Rp {change:,}")
+    else:
+        st.error(f"Amount insufficient: Rp {-change:,}")
 
 # Menu Management Page
 def menu_page():
     st.header("🍔 Menu Management")
     
+    catalogue = get_menu_catalogue()
+    
     # Form to add new menu item
     with st.form(key='menu_form', clear_on_submit=True):
         st.subheader("Add New Menu Item")
         name = st.text_input("Item Name")
         price = st.number_input("Price", min_value=1000, step=1000)
+        category = st.text_input("Category", value="General")
         
         if st.form_submit_button("Add Item", type="primary"):
             if name and price:
-                # Check if item already exists
-                if any(item['name'].lower() == name.lower() for item in st.session_state.menu):
-                    st.error("Item already exists!")
-                else:
-                    new_id = max(item['id'] for item in st.session_state.menu) + 1
-                    st.session_state.menu.append({
-                        'id': new_id,
-                        'name': name,
-                        'price': price
-                    })
+                try:
+                    catalogue.add(name, price, category)
                     st.success(f"{name} added to menu!")
+                except ValueError:
+                    st.error("Item already exists!")
             else:
                 st.error("Name and price are required!")
     
@@ -447,120 +656,321 @@ def menu_page():
     
     # Menu list table
     st.subheader("Menu List")
-    if not st.session_state.menu:
+    if not catalogue.items:
         st.info("No menu items available")
     else:
-        menu_df = []
-        for item in st.session_state.menu:
-            menu_df.append({
-                'ID': item['id'],
-                'Name': item['name'],
-                'Price': f"Rp {item['price']:,}"
-            })
-        
-        df = pd.DataFrame(menu_df)
         st.dataframe(
-            df,
+            pd.DataFrame(catalogue.items),
             column_config={
-                "ID": st.column_config.NumberColumn("ID", width="small"),
-                "Name": st.column_config.TextColumn("Item Name", width="medium"),
-                "Price": st.column_config.TextColumn("Price", width="medium")
+                "id": st.column_config.NumberColumn("ID", width="small"),
+                "name": st.column_config.TextColumn("Item Name", width="medium"),
+                "price": st.column_config.NumberColumn("Price (Rp)", format="localized", width="medium"),
+                "category": st.column_config.TextColumn("Category", width="medium")
             },
             hide_index=True,
             use_container_width=True
         )
+        st.caption(f"Menu version {catalogue.version}")
+        
+        def item_label(item_id):
+            item = catalogue.get(item_id)
+            return f"{item['id']} - {item['name']} (Rp {item['price']:,})"
+        
+        item_ids = [item['id'] for item in catalogue.items]
+        
+        # Change price; every register picks it up on its next rerun
+        st.subheader("Update Price")
+        update_id = st.selectbox("Select item to update", item_ids, format_func=item_label)
+        new_price = st.number_input("New Price", min_value=1000, step=1000,
+                                    value=catalogue.get(update_id)['price'])
+        if st.button("Update Price"):
+            catalogue.update_price(update_id, new_price)
+            st.success("Price updated!")
         
         # Delete menu item
         st.subheader("Delete Menu Item")
-        menu_options = [f"{item['id']} - {item['name']} (Rp {item['price']:,})" for item in st.session_state.menu]
-        delete_menu = st.selectbox("Select item to delete", menu_options)
+        delete_id = st.selectbox("Select item to delete", item_ids, format_func=item_label)
         
         if st.button("Delete Item", type="secondary"):
-            menu_id = int(delete_menu.split(" - ")[0])
-            st.session_state.menu = [item for item in st.session_state.menu if item['id'] != menu_id]
+            catalogue.delete(delete_id)
             st.success("Item deleted successfully!")
 
 # Transactions Page
+TRANSACTIONS_PAGE_SIZE = 50
+
+EXPORT_FORMATS = {'CSV': 'csv'}
+if importlib.util.find_spec("pyarrow"):
+    EXPORT_FORMATS['Parquet'] = 'parquet'
+
+def export_panel():
+    """Monthly export for accounting, streamed chunk by chunk to a temporary file"""
+    today = datetime.date.today()
+    date_range = st.date_input("Export period", value=(today.replace(day=1), today), key="export_range")
+    col1, col2 = st.columns(2)
+    source = col1.radio("Source", ["Local journal", "Spreadsheet"], horizontal=True, key="export_source",
+                        help="The spreadsheet is read in ranges of %d rows" % export.CHUNK_ROWS)
+    label = col2.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    if len(date_range) != 2:
+        st.caption("Pick an end date")
+        return
+    
+    start = datetime.datetime.combine(date_range[0], datetime.time.min)
+    end = datetime.datetime.combine(date_range[1], datetime.time.max)
+    fmt = EXPORT_FORMATS[label]
+    
+    def build():
+        # Runs on click, in its own thread
+        with get_metrics().span("export", source=source, format=fmt):
+            if source == "Spreadsheet":
+                sheet = get_sheet()
+                if not sheet:
+                    raise RuntimeError("No sheet connection")
+                chunks = export.sheet_chunks(sheet, api=get_sheets_api())
+                partitions = get_sheet_partitions()
+                if partitions:
+                    # sheet1 holds rows from before partitioning; then only the periods in range
+                    chunks = itertools.chain(chunks, *(
+                        export.sheet_chunks(partitions.sheets(period, create=False)[0], api=get_sheets_api())
+                        for period in partitions.periods_between(start, end)
+                    ))
+            else:
+                chunks = export.journal_chunks(get_journal())
+            f, _ = export.export(export.between(chunks, start, end), fmt)
+            return f
+    
+    st.download_button(
+        f"Download {label}",
+        data=build,
+        file_name=f"transactions_{date_range[0]:%Y%m%d}_{date_range[1]:%Y%m%d}.{fmt}",
+        mime="text/csv" if fmt == "csv" else "application/octet-stream"
+    )
+
 def transactions_page():
     st.header("📋 Transaction History")
     
-    if not st.session_state.transactions:
+    with st.expander("Export transactions"):
+        export_panel()
+    
+    frame = sync_history()
+    
+    if not len(frame):
         st.info("No transactions recorded")
     else:
-        # Transaction summary
-        total_transactions = len(st.session_state.transactions)
-        total_revenue = sum(t['total'] for t in st.session_state.transactions)
-        
+        # Transaction summary (running totals, no scan)
         col1, col2 = st.columns(2)
-        col1.metric("Total Transactions", total_transactions)
-        col2.metric("Total Revenue", f"Rp {total_revenue:,}")
+        col1.metric("Total Transactions", len(frame))
+        col2.metric("Total Revenue", f"Rp {frame.total_revenue:,}")
         
         st.divider()
         
-        # Transactions table
-        transactions_df = []
-        for t in st.session_state.transactions:
-            transactions_df.append({
-                'ID': t['id'],
-                'Time': t['time'],
-                'Items': sum(item['qty'] for item in t['items']),
-                'Total': f"Rp {t['total']:,}",
-                'Paid': f"Rp {t['amount_paid']:,}",
-                'Change': f"Rp {t['change']:,}"
-            })
+        # Filters: binary search on time, inverted index on items
+        with st.expander("Filter transactions"):
+            first_day = pd.Timestamp(frame.column('time').min()).date()
+            last_day = pd.Timestamp(frame.column('time').max()).date()
+            date_range = st.date_input("Date range", value=(first_day, last_day))
+            col1, col2 = st.columns(2)
+            min_total = col1.number_input("Min total", min_value=0, value=0, step=1000)
+            max_total = col2.number_input("Max total", min_value=0, value=0, step=1000,
+                                          help="0 means no upper limit")
+            item = st.selectbox("Containing item", ["All items"] + frame.item_names())
+        
+        start = end = None
+        if len(date_range) == 2:
+            start = datetime.datetime.combine(date_range[0], datetime.time.min)
+            end = datetime.datetime.combine(date_range[1], datetime.time.max)
+        positions = frame.filter(
+            start=start,
+            end=end,
+            min_total=min_total or None,
+            max_total=max_total or None,
+            item=None if item == "All items" else item
+        )
+        
+        if not len(positions):
+            st.info("No transactions match the filter")
+            return
+        
+        # Transactions table, newest first, one page at a time
+        page_count = (len(positions) - 1) // TRANSACTIONS_PAGE_SIZE + 1
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        st.caption(f"{len(positions)} transactions · page {page} of {page_count}")
+        with get_metrics().span("dataframe_build", page="transactions"):
+            page_df = frame.page(page - 1, TRANSACTIONS_PAGE_SIZE, positions)
         
         st.dataframe(
-            pd.DataFrame(transactions_df),
+            page_df,
             column_config={
                 "ID": st.column_config.NumberColumn("ID", width="small"),
                 "Time": st.column_config.DatetimeColumn("Time", format="YYYY-MM-DD HH:mm:ss"),
                 "Items": st.column_config.NumberColumn("Items", width="small"),
-                "Total": st.column_config.TextColumn("Total", width="medium"),
-                "Paid": st.column_config.TextColumn("Paid", width="medium"),
-                "Change": st.column_config.TextColumn("Change", width="medium")
+                "Total": st.column_config.NumberColumn("Total (Rp)", format="localized", width="medium"),
+                "Paid": st.column_config.NumberColumn("Paid (Rp)", format="localized", width="medium"),
+                "Change": st.column_config.NumberColumn("Change (Rp)", format="localized", width="medium")
             },
             hide_index=True,
             use_container_width=True
         )
         
-        # Transaction details
+        # Transaction details: direct ID lookup, or pick from the current page
         st.divider()
         st.subheader("Transaction Details")
-        transaction_options = [f"{t['id']} - {t['time']} (Rp {t['total']:,})" for t in st.session_state.transactions]
-        selected_transaction = st.selectbox("Select transaction to view details", transaction_options)
+        lookup_id = st.number_input("Transaction ID", min_value=0, value=0, step=1,
+                                    help="Enter an ID to open any receipt; 0 to pick from this page")
+        if lookup_id:
+            position = frame.find(int(lookup_id))
+            if position is None:
+                st.warning(f"Transaction {lookup_id} not found")
+            else:
+                page_df = frame.rows([position])
+        else:
+            position = st.selectbox(
+                "Select transaction to view details",
+                page_df.index,
+                format_func=lambda i: f"{page_df.at[i, 'ID']} - {page_df.at[i, 'Time']} (Rp {page_df.at[i, 'Total']:,})"
+            )
         
-        if selected_transaction:
-            transaction_id = int(selected_transaction.split(" - ")[0])
-            transaction = next(t for t in st.session_state.transactions if t['id'] == transaction_id)
+        if position is not None:
+            transaction = page_df.loc[position]
             
-            st.markdown(f"**Transaction ID:** {transaction['id']}")
-            st.markdown(f"**Time:** {transaction['time']}")
-            st.markdown(f"**Total:** Rp {transaction['total']:,}")
-            st.markdown(f"**Paid:** Rp {transaction['amount_paid']:,}")
-            st.markdown(f"**Change:** Rp {transaction['change']:,}")
+            st.markdown(f"**Transaction ID:** {transaction['ID']}")
+            st.markdown(f"**Time:** {transaction['Time']}")
+            st.markdown(f"**Total:** Rp {transaction['Total']:,}")
+            st.markdown(f"**Paid:** Rp {transaction['Paid']:,}")
+            st.markdown(f"**Change:** Rp {transaction['Change']:,}")
             
             st.subheader("Items Purchased")
-            item_df = []
-            for item in transaction['items']:
-                item_df.append({
-                    'Item': item['name'],
-                    'Unit Price': f"Rp {item['price']:,}",
-                    'Qty': item['qty'],
-                    'Subtotal': f"Rp {item['price'] * item['qty']:,}"
-                })
-            
+            items = frame.items_at(position)
             st.dataframe(
-                pd.DataFrame(item_df),
+                pd.DataFrame({
+                    'Item': [item.name for item in items],
+                    'Unit Price': [item.price for item in items],
+                    'Qty': [item.qty for item in items],
+                    'Subtotal': [item.price * item.qty for item in items]
+                }),
                 column_config={
                     "Item": st.column_config.TextColumn("Item", width="medium"),
-                    "Unit Price": st.column_config.TextColumn("Unit Price", width="medium"),
+                    "Unit Price": st.column_config.NumberColumn("Unit Price (Rp)", format="localized", width="medium"),
                     "Qty": st.column_config.NumberColumn("Qty", width="small"),
-                    "Subtotal": st.column_config.TextColumn("Subtotal", width="medium")
+                    "Subtotal": st.column_config.NumberColumn("Subtotal (Rp)", format="localized", width="medium")
                 },
                 hide_index=True,
                 use_container_width=True
             )
 
+# Reports Page
+OPTION_LABELS = {
+    '1': "Option 1",
+    '2': "Option 2",
+    '3': "Option 3",
+    'Manual': "Manual"
+}
+
+def reports_page():
+    st.header("📈 Sales Reports")
+    
+    sync_history()
+    analytics = get_sales_analytics()
+    
+    if not analytics.transactions:
+        st.info("No transactions recorded")
+        return
+    
+    # Headline numbers come straight from the running rollups
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Transactions", f"{analytics.transactions:,}")
+    col2.metric("Revenue", f"Rp {analytics.revenue:,}")
+    col3.metric("Average Ticket", f"Rp {analytics.average_ticket():,.0f}")
+    col4.metric("Average Basket", f"{analytics.basket_size():.1f} items")
+    
+    st.divider()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Revenue by Hour")
+        st.bar_chart(pd.DataFrame(
+            {'Revenue': analytics.revenue_by_hour},
+            index=pd.Index(range(24), name="Hour")
+        ))
+    with col2:
+        st.subheader("Revenue by Day")
+        st.line_chart(analytics.revenue_by_day.rename("Revenue"))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Top Items")
+        with get_metrics().span("dataframe_build", page="reports"):
+            top_items = analytics.top_items()
+        st.dataframe(
+            top_items,
+            column_config={
+                "Item": st.column_config.TextColumn("Item", width="medium"),
+                "Qty": st.column_config.NumberColumn("Qty", width="small"),
+                "Revenue": st.column_config.NumberColumn("Revenue (Rp)", format="localized", width="medium")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    with col2:
+        st.subheader("Payment Option Mix")
+        mix = analytics.option_counts.rename(index=lambda o: OPTION_LABELS.get(o, o))
+        st.bar_chart(mix.rename("Transactions"))
+
+# Metrics Page
+def metrics_page():
+    st.header("⏱️ Performance Metrics")
+    
+    metrics = get_metrics()
+    uptime = datetime.timedelta(seconds=int(time.time() - metrics.started))
+    st.caption(f"Since process start ({uptime} ago); percentiles cover the most recent samples of each series")
+    
+    latencies = pd.DataFrame(metrics.summary())
+    st.subheader("Latency")
+    if latencies.empty:
+        st.info("No timings recorded yet")
+    else:
+        for column in ['mean', 'p50', 'p95', 'p99', 'max']:
+            latencies[column] = latencies[column] * 1000
+        st.dataframe(
+            latencies,
+            column_config={
+                "name": st.column_config.TextColumn("Stage"),
+                "labels": st.column_config.TextColumn("Labels"),
+                "count": st.column_config.NumberColumn("Count", width="small"),
+                **{
+                    column: st.column_config.NumberColumn(f"{column} (ms)", format="%.1f", width="small")
+                    for column in ['mean', 'p50', 'p95', 'p99', 'max']
+                }
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    counters = pd.DataFrame(metrics.counters())
+    st.subheader("Counters")
+    if counters.empty:
+        st.info("No counters recorded yet")
+    else:
+        st.dataframe(counters, hide_index=True, use_container_width=True)
+    
+    # Prometheus text export; `metrics_port` in secrets also serves it at /metrics
+    exposition = metrics.prometheus()
+    st.download_button("Download Prometheus metrics", exposition,
+                       file_name="pos_metrics.txt", mime="text/plain")
+    with st.expander("Prometheus text"):
+        st.code(exposition, language="text")
+    
+    # cProfile capture is development-only
+    if not PRODUCTION_MODE:
+        st.divider()
+        st.subheader("Profiler")
+        if st.button("Profile next rerun", help="Capture the next rerun, e.g. after switching to POS"):
+            st.session_state.profile_next_rerun = True
+            st.info("The next rerun will be profiled")
+        if 'last_profile' in st.session_state:
+            page, captured, stats = st.session_state.last_profile
+            st.caption(f"Last capture: {page} page at {captured:%H:%M:%S}")
+            st.code(stats, language="text")
+
 # Page configuration
 st.set_page_config(
     page_title="POS System",
@@ -574,8 +984,8 @@ with st.sidebar:
     st.title("🛒 POS System")
     selected = option_menu(
         menu_title=None,
-        options=["POS", "Menu", "Transactions"],
-        icons=["cash-coin", "book", "clock-history"],
+        options=["POS", "Menu", "Transactions", "Reports", "Metrics"],
+        icons=["cash-coin", "book", "clock-history", "bar-chart", "speedometer2"],
         default_index=0
     )
     
@@ -585,35 +995,68 @@ with st.sidebar:
     # Google Sheets status
     if st.button("Check Google Sheets Status"):
         try:
-            client = get_google_sheets_connection()
-            if client:
-                try:
-                    spreadsheets = client.list_spreadsheet_files()
-                    st.success("Google Sheets connected")
-                    
-                    # Check if our sheet exists
-                    found = any(s['name'] == SHEET_NAME for s in spreadsheets)
-                    if found:
-                        st.success(f"Spreadsheet '{SHEET_NAME}' exists")
-                        try:
-                            sheet = get_sheet()
-                            records = sheet.get_all_records()
-                            st.info(f"{len(records)} transactions logged")
-                        except:
-                            st.info("Sheet is empty")
-                    else:
-                        st.warning(f"Spreadsheet '{SHEET_NAME}' not found")
-                except Exception as e:
-                    handle_error("Connection check error", e)
+            status = get_sheets_status()
+            if status['connected']:
+                st.success(f"{status['backend']} '{status['title']}' connected")
+                st.info(f"{status['synced_rows']} transactions logged")
+                st.caption(f"API latency: {status['probe_latency'] * 1000:.0f} ms")
             else:
-                st.warning("Google Sheets not connected")
+                st.warning(f"{status['backend']} not connected")
+            
+            st.caption(f"Waiting to sync: {status['queue_depth']}")
+            if status['throttled']:
+                st.caption(f"Quota retries: {status['throttled']}")
+            if status['last_sync']:
+                last_sync = datetime.datetime.fromtimestamp(status['last_sync'])
+                st.caption(f"Last sync: {last_sync:%Y-%m-%d %H:%M:%S} "
+                           f"({status['write_latency'] * 1000:.0f} ms)")
+            if status['last_error'] and not PRODUCTION_MODE:
+                st.caption(f"Last error: {status['last_error']}")
         except Exception as e:
             handle_error("Connection check error", e)
+    
+    # Find journaled sales the sheet is missing and append them in a few large batches
+    if uses_sheets() and st.button("Reconcile with Google Sheets"):
+        try:
+            with st.spinner("Comparing the journal with the sheet..."):
+                summary = reconcile_sheet()
+            for line in describe_reconciliation(summary):
+                st.caption(line)
+        except Exception as e:
+            get_log_backend().invalidate(e)
+            handle_error("Reconciliation error", e)
+
+# In development one rerun can be captured with cProfile, from here to the end of the script
+profiler = None
+if not PRODUCTION_MODE and st.session_state.pop('profile_next_rerun', False):
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+# Display selected page; the finally block runs on errors and interrupted reruns too
+try:
+    if selected == "POS":
+        pos_page()
+    elif selected == "Menu":
+        menu_page()
+    elif selected == "Transactions":
+        transactions_page()
+    elif selected == "Reports":
+        reports_page()
+    elif selected == "Metrics":
+        metrics_page()
+
+    # Start replication (and the token refresher) before the first checkout needs them
+    get_sheet_writer()
+    if uses_sheets():
+        get_sheet_reader()
 
-# Display selected page
-if selected == "POS":
-    pos_page()
-elif selected == "Menu":
-    menu_page()
-elif selected == "Transactions":
-    transactions_page()
\ No newline at end of file
+    metrics_port = get_setting("metrics_port", None)
+    if metrics_port:
+        start_metrics_endpoint(int(metrics_port))
+finally:
+    get_metrics().observe("rerun_seconds", time.perf_counter() - rerun_started, page=selected)
+    if profiler:
+        profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        st.session_state.last_profile = (selected, datetime.datetime.now(), report.getvalue())
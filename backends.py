@@ -0,0 +1,268 @@
+import csv
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+SHEET_NAME = "POS_Transaction_Log"
+LINE_ITEMS_SHEET = "Line Items"  # Worksheet inside SHEET_NAME
+
+LOG_HEADER = [
+    "Transaction ID", "Timestamp", "Total Amount",
+    "Option 1", "Option 2", "Option 3",
+    "Amount Paid", "Selected Option", "Items"
+]
+LINE_ITEMS_HEADER = ["Transaction ID", "Item ID", "Unit Price", "Qty"]
+
+
+def append_cells_request(sheet_id, rows):
+    """batchUpdate appendCells request; numbers stay numbers, everything else is text"""
+    def cell(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return {'userEnteredValue': {'numberValue': value}}
+        return {'userEnteredValue': {'stringValue': str(value)}}
+
+    return {
+        'appendCells': {
+            'sheetId': sheet_id,
+            'rows': [{'values': [cell(v) for v in row]} for row in rows],
+            'fields': 'userEnteredValue',
+        }
+    }
+
+
+def ensure_header(sheet, header, api=None):
+    """Write the header row unless the sheet already starts with it; safe to repeat after a failure"""
+    def call(fn, *args, **kwargs):
+        return api.call(fn, *args, **kwargs) if api else fn(*args, **kwargs)
+
+    last_column = chr(ord('A') + len(header) - 1)
+    first = call(sheet.spreadsheet.values_get, f"'{sheet.title}'!A1:{last_column}1").get('values', [])
+    if not first:
+        call(sheet.append_row, header)
+    elif str(first[0][0]) != header[0]:
+        # Rows were appended before the header made it; put it above them
+        call(sheet.insert_row, header, 1)
+
+
+class LogBackend:
+    """Destination the replicator copies journaled transactions to"""
+
+    name = "backend"
+
+    def append(self, rows, line_items):
+        """Write transaction rows (LOG_HEADER order) and line-item rows (LINE_ITEMS_HEADER order)"""
+        raise NotImplementedError
+
+    def status(self):
+        """Cheap health probe: {'connected', 'title', 'rows', 'probe_latency'}"""
+        raise NotImplementedError
+
+    def invalidate(self, exception):
+        """Called after a failed append so cached handles can be dropped"""
+
+
+class SheetsBackend(LogBackend):
+    """Google Sheets (or FakeClient) worksheets resolved through the given callables
+
+    With `partitions` (a partitions.SheetPartitions) rows go to the worksheets
+    of their period instead of get_sheet()/get_line_sheet().
+    """
+
+    name = "Google Sheets"
+
+    def __init__(self, get_sheet, get_line_sheet=None, api=None, on_error=None, partitions=None):
+        self.get_sheet = get_sheet
+        self.get_line_sheet = get_line_sheet  # Optional worksheet for normalized line items
+        self.api = api  # Optional SheetsApi enforcing the request budget
+        self.on_error = on_error
+        self.partitions = partitions
+
+    def _call(self, fn, *args, **kwargs):
+        if self.api:
+            return self.api.call(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def append(self, rows, line_items):
+        if self.partitions:
+            self._append_partitioned(rows, line_items)
+            return
+
+        sheet = self.get_sheet()
+        if not sheet:
+            raise RuntimeError("No sheet connection")
+        line_sheet = self.get_line_sheet() if self.get_line_sheet else None
+
+        if line_sheet:
+            # Header rows and their line items go out in one batchUpdate
+            requests = [append_cells_request(sheet.id, rows)]
+            if line_items:
+                requests.append(append_cells_request(line_sheet.id, line_items))
+            self._call(sheet.spreadsheet.batch_update, {'requests': requests})
+        else:
+            self._call(sheet.append_rows, rows, value_input_option="RAW")
+
+    def _append_partitioned(self, rows, line_items):
+        # Group by period; line items follow their transaction
+        batches = {}
+        period_of = {}
+        for row in rows:
+            period = self.partitions.period(row[1])
+            batches.setdefault(period, ([], []))[0].append(row)
+            period_of[str(row[0])] = period
+        for line in line_items:
+            batches[period_of[str(line[0])]][1].append(line)
+
+        # Still one batchUpdate, even across a period boundary
+        requests = []
+        for period, (period_rows, period_lines) in sorted(batches.items()):
+            log_sheet, line_sheet = self.partitions.sheets(period)
+            requests.append(append_cells_request(log_sheet.id, period_rows))
+            if period_lines:
+                requests.append(append_cells_request(line_sheet.id, period_lines))
+        self._call(log_sheet.spreadsheet.batch_update, {'requests': requests})
+
+    def status(self):
+        status = {'connected': False, 'title': None, 'rows': None, 'probe_latency': None}
+        sheet = self.get_sheet()
+        if not sheet:
+            return status
+        if self.partitions:
+            # Report the partition currently being written, if it exists yet
+            current = self.partitions.sheets(self.partitions.period(datetime.datetime.now()), create=False)
+            if current:
+                sheet = current[0]
+        started = time.perf_counter()
+        metadata = self._call(
+            sheet.spreadsheet.fetch_sheet_metadata,
+            params={'fields': 'properties.title,sheets.properties'}
+        )
+        status['probe_latency'] = time.perf_counter() - started
+        status['connected'] = True
+        status['title'] = metadata['properties']['title']
+        for props in (s['properties'] for s in metadata['sheets']):
+            if props['sheetId'] == sheet.id:
+                status['rows'] = props['gridProperties']['rowCount']
+        return status
+
+    def invalidate(self, exception):
+        if self.on_error:
+            self.on_error(exception)
+
+
+class SqliteBackend(LogBackend):
+    """Transaction log kept in a local SQLite file"""
+
+    name = "SQLite"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f'"{name}" TEXT' for name in LOG_HEADER)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS transaction_log ({columns})")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS line_items (
+                transaction_id INTEGER, item_id INTEGER, unit_price INTEGER, qty INTEGER
+            )
+        """)
+
+    def append(self, rows, line_items):
+        placeholders = ", ".join("?" for _ in LOG_HEADER)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(f"INSERT INTO transaction_log VALUES ({placeholders})", rows)
+                self._conn.executemany("INSERT INTO line_items VALUES (?, ?, ?, ?)", line_items)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def status(self):
+        started = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM transaction_log").fetchone()[0]
+        return {
+            'connected': True,
+            'title': self.path,
+            'rows': rows,
+            'probe_latency': time.perf_counter() - started,
+        }
+
+
+class CsvBackend(LogBackend):
+    """transactions.csv and line_items.csv in a directory"""
+
+    name = "CSV"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.log_path = os.path.join(directory, "transactions.csv")
+        self.line_items_path = os.path.join(directory, "line_items.csv")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.rows = self._prepare(self.log_path, LOG_HEADER)
+        self._prepare(self.line_items_path, LINE_ITEMS_HEADER)
+
+    @staticmethod
+    def _prepare(path, header):
+        """Write the header for a new file; count data rows of an existing one"""
+        if not os.path.exists(path):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(header)
+            return 0
+        with open(path, newline="", encoding="utf-8") as f:
+            return sum(1 for _ in csv.reader(f)) - 1
+
+    def append(self, rows, line_items):
+        with self._lock:
+            with open(self.log_path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+            with open(self.line_items_path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(line_items)
+            self.rows += len(rows)
+
+    def status(self):
+        return {'connected': True, 'title': self.log_path, 'rows': self.rows, 'probe_latency': 0.0}
+
+
+class ParquetBackend(LogBackend):
+    """One Parquet part file per batch under transactions/ and line_items/ (needs pyarrow)"""
+
+    name = "Parquet"
+
+    def __init__(self, directory):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet backend requires pyarrow (pip install pyarrow)")
+
+        self.directory = directory
+        self._lock = threading.Lock()
+        for part in ("transactions", "line_items"):
+            os.makedirs(os.path.join(directory, part), exist_ok=True)
+        log_dir = os.path.join(directory, "transactions")
+        self.rows = sum(
+            pq.read_metadata(os.path.join(log_dir, name)).num_rows
+            for name in os.listdir(log_dir) if name.endswith(".parquet")
+        )
+
+    def append(self, rows, line_items):
+        import pandas as pd
+
+        with self._lock:
+            part = f"part-{time.time_ns()}.parquet"
+            pd.DataFrame(rows, columns=LOG_HEADER).to_parquet(
+                os.path.join(self.directory, "transactions", part), index=False
+            )
+            if line_items:
+                pd.DataFrame(line_items, columns=LINE_ITEMS_HEADER).to_parquet(
+                    os.path.join(self.directory, "line_items", part), index=False
+                )
+            self.rows += len(rows)
+
+    def status(self):
+        return {'connected': True, 'title': self.directory, 'rows': self.rows, 'probe_latency': 0.0}
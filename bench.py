@@ -0,0 +1,228 @@
+"""Load test: drive simulated cashier sessions through app.py with AppTest
+
+    python bench.py --sessions 8 --transactions 5 --latency 0.2 --error-rate 0.05
+
+Every session adds items, picks a payment option, completes the transaction
+and opens the Transactions page. The app runs in a scratch directory against
+the in-memory fake Sheets backend. A summary line is appended to
+bench_results.jsonl so runs can be compared across commits.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(APP_DIR, "bench_results.jsonl")
+
+# option_menu is a browser component, so pages are switched through session state
+SCRIPT = f'''
+import runpy, sys
+import streamlit as st
+import streamlit_option_menu
+sys.path.insert(0, {APP_DIR!r})
+streamlit_option_menu.option_menu = lambda *args, **kwargs: st.session_state.get("_page", "POS")
+runpy.run_path({os.path.join(APP_DIR, "app.py")!r}, run_name="__main__")
+'''
+
+# AppTest installs a process-global Runtime for the length of each run, so reruns
+# from different sessions cannot overlap. Sessions queue for it instead, the way
+# script threads on a real server queue for the GIL; background replication
+# still runs concurrently.
+_run_lock = threading.Lock()
+
+
+class Session:
+    """One simulated register; records the latency of every rerun it triggers"""
+
+    def __init__(self, seed, timeout):
+        self.at = AppTest.from_string(SCRIPT, default_timeout=timeout)
+        self.random = random.Random(seed)
+        self.timings = {}  # Action -> [seconds, ...] including time queued behind other sessions
+        self.service = []  # Seconds spent running the script itself, excluding the first load
+        self.transactions = 0
+        self.errors = 0
+
+    def _run(self, action, element=None):
+        started = time.perf_counter()
+        with _run_lock:
+            running = time.perf_counter()
+            if element is None:
+                self.at.run()
+            else:
+                element.run()
+            finished = time.perf_counter()
+        if action != "load":
+            self.service.append(finished - running)
+        self.timings.setdefault(action, []).append(finished - started)
+        self.errors += len(self.at.exception)
+
+    def start(self):
+        self._run("load")
+
+    def checkout(self, items_per_order):
+        menu = [b for b in self.at.button if b.key and b.key.startswith("menu_")]
+        for _ in range(self.random.randint(1, items_per_order)):
+            self._run("add_item", self.random.choice(menu).click())
+        option = self.random.choice(["option1", "option2", "option3"])
+        self._run("pay_option", self.at.button(key=option).click())
+        complete = next(b for b in self.at.button if b.label == "Complete Transaction")
+        self._run("checkout", complete.click())
+        self.transactions += 1
+
+    def open_page(self, page):
+        self.at.session_state["_page"] = page
+        self._run(page.lower())
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        'count': len(ms),
+        'p50_ms': round(float(np.percentile(ms, 50)), 1),
+        'p95_ms': round(float(np.percentile(ms, 95)), 1),
+        'p99_ms': round(float(np.percentile(ms, 99)), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(sessions, transactions, items_per_order, timeout, seed):
+    # Warm-up session builds the process-wide caches, so memory below is per-session only
+    warmup = Session(seed, timeout)
+    warmup.start()
+    warmup.checkout(1)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    registers = [Session(seed + i + 1, timeout) for i in range(sessions)]
+    for register in registers:
+        register.start()
+    session_bytes = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+
+    def drive(register):
+        for _ in range(transactions):
+            register.checkout(items_per_order)
+        register.open_page("Transactions")
+        register.open_page("POS")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(drive, registers))
+    elapsed = time.perf_counter() - started
+
+    timings = {}
+    for register in registers:
+        for action, samples in register.timings.items():
+            timings.setdefault(action, []).extend(samples)
+    completed = sum(r.transactions for r in registers)
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'transactions': completed,
+        'tps': round(completed / elapsed, 2),
+        'memory_per_session_kb': round(session_bytes / 1024, 1),
+        'script_errors': sum(r.errors for r in registers),
+        'rerun': percentiles([t for action, samples in timings.items() if action != "load" for t in samples]),
+        'service': percentiles([t for r in registers for t in r.service]),
+        'actions': {action: percentiles(samples) for action, samples in sorted(timings.items())},
+    }
+
+
+def previous_result(params):
+    """Most recent saved run with the same parameters"""
+    if not os.path.exists(RESULTS_PATH):
+        return None
+    match = None
+    with open(RESULTS_PATH, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('params') == params:
+                match = record
+    return match
+
+
+def print_report(record, previous):
+    result = record['result']
+    print(f"{result['transactions']} transactions in {result['elapsed_s']} s "
+          f"({result['tps']} TPS), {result['memory_per_session_kb']} KB/session, "
+          f"{result['script_errors']} script errors")
+    print(f"{'action':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(result['actions'].items()) + [("all reruns", result['rerun']), ("script only", result['service'])]
+    for action, stats in rows:
+        print(f"{action:<14}{stats['count']:>6}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+    if previous:
+        old = previous['result']
+        print(f"vs {previous['commit'] or 'previous run'} ({previous['timestamp']}): "
+              f"TPS {old['tps']} -> {result['tps']}, "
+              f"p95 {old['rerun']['p95_ms']} -> {result['rerun']['p95_ms']} ms, "
+              f"memory {old['memory_per_session_kb']} -> {result['memory_per_session_kb']} KB/session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent POS sessions against fake Sheets")
+    parser.add_argument("--sessions", type=int, default=4, help="Simulated registers running at once")
+    parser.add_argument("--transactions", type=int, default=5, help="Checkouts per session")
+    parser.add_argument("--items", type=int, default=3, help="Maximum item taps per order")
+    parser.add_argument("--latency", type=float, default=0.1, help="Fake Sheets seconds per API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake API calls failing with 429")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help=f"Do not append to {os.path.basename(RESULTS_PATH)}")
+    args = parser.parse_args()
+
+    params = {
+        'sessions': args.sessions,
+        'transactions': args.transactions,
+        'items': args.items,
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+    }
+
+    # Scratch working directory: its own journal, menu and secrets
+    workdir = tempfile.mkdtemp(prefix="pos-bench-")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write(f'log_backend = "fake"\n'
+                f'fake_sheets_latency = {args.latency}\n'
+                f'fake_sheets_error_rate = {args.error_rate}\n')
+    os.chdir(workdir)
+
+    result = run_benchmark(args.sessions, args.transactions, args.items, args.timeout, args.seed)
+    record = {
+        'timestamp': datetime.datetime.now().isoformat(timespec="seconds"),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'params': params,
+        'result': result,
+    }
+    print_report(record, previous_result(params))
+
+    if not args.no_save:
+        with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Saved to {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+# Immutable line of a completed order
+LineItem = namedtuple('LineItem', ['id', 'name', 'price', 'qty'])
+
+
+class _Line:
+    __slots__ = ('name', 'price', 'qty')
+
+    def __init__(self, name, price, qty):
+        self.name = name
+        self.price = price
+        self.qty = qty
+
+
+class Cart:
+    """Shopping cart keyed by menu ID with running totals"""
+
+    def __init__(self):
+        self._lines = {}  # Menu ID -> _Line, in insertion order
+        self.total = 0
+        self.count = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        for item_id, line in self._lines.items():
+            yield LineItem(item_id, line.name, line.price, line.qty)
+
+    def add(self, item, qty=1):
+        """Add a menu item dict"""
+        line = self._lines.get(item['id'])
+        if line:
+            line.qty += qty
+        else:
+            self._lines[item['id']] = _Line(item['name'], item['price'], qty)
+            line = self._lines[item['id']]
+        self.total += line.price * qty
+        self.count += qty
+
+    def decrement(self, item_id):
+        """Take one unit off a line; the line goes away at zero"""
+        line = self._lines.get(item_id)
+        if not line:
+            return
+        if line.qty == 1:
+            self.remove(item_id)
+            return
+        line.qty -= 1
+        self.total -= line.price
+        self.count -= 1
+
+    def remove(self, item_id):
+        line = self._lines.pop(item_id, None)
+        if line:
+            self.total -= line.price * line.qty
+            self.count -= line.qty
+
+    def clear(self):
+        self._lines.clear()
+        self.total = 0
+        self.count = 0
+
+    def subtotal(self, item_id):
+        line = self._lines[item_id]
+        return line.price * line.qty
+
+    def freeze(self):
+        """Immutable snapshot for a completed order; shares nothing with the live cart"""
+        return tuple(self)
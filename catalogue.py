@@ -0,0 +1,151 @@
+import re
+import sqlite3
+import threading
+
+DEFAULT_CATEGORY = "General"
+DEFAULT_MENU = [
+    {'id': 1, 'name': 'Fried Rice', 'price': 15000, 'category': 'Food'},
+    {'id': 2, 'name': 'Fried Noodles', 'price': 12000, 'category': 'Food'},
+    {'id': 3, 'name': 'Fried Chicken', 'price': 18000, 'category': 'Food'},
+    {'id': 4, 'name': 'Iced Tea', 'price': 5000, 'category': 'Drinks'},
+    {'id': 5, 'name': 'Orange Juice', 'price': 6000, 'category': 'Drinks'},
+]
+MAX_PREFIX = 8  # Longer search tokens are narrowed from their 8-character prefix
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+class MenuCatalogue:
+    """Process-wide menu stored in SQLite, versioned so readers reload only after an edit"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS menu_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                price INTEGER NOT NULL,
+                category TEXT NOT NULL DEFAULT 'General'
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(menu_items)")}
+        if 'category' not in columns:
+            self._conn.execute(
+                f"ALTER TABLE menu_items ADD COLUMN category TEXT NOT NULL DEFAULT '{DEFAULT_CATEGORY}'"
+            )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS menu_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("BEGIN IMMEDIATE")
+        if self._conn.execute("INSERT OR IGNORE INTO menu_version (id, version) VALUES (1, 0)").rowcount:
+            self._conn.executemany(
+                "INSERT INTO menu_items (id, name, price, category) VALUES (:id, :name, :price, :category)",
+                DEFAULT_MENU
+            )
+            self._conn.execute("UPDATE menu_version SET version = 1")
+        self._conn.execute("COMMIT")
+
+        self.version = -1
+        self.items = ()  # Immutable snapshot, replaced wholesale on reload
+        # (by ID, by lowercase name, category -> items in ID order, token prefix -> item IDs),
+        # built off to the side and swapped in as one reference so lock-free readers never mix reloads
+        self._index = ({}, {}, {}, {})
+        self.sync()
+
+    def _stored_version(self):
+        return self._conn.execute("SELECT version FROM menu_version").fetchone()[0]
+
+    def sync(self):
+        """Reload only if another session or process changed the menu; returns True on reload"""
+        with self._lock:
+            version = self._stored_version()
+            if version == self.version:
+                return False
+            rows = self._conn.execute(
+                "SELECT id, name, price, category FROM menu_items ORDER BY id"
+            ).fetchall()
+            items = tuple({'id': i, 'name': n, 'price': p, 'category': c} for i, n, p, c in rows)
+            by_category = {}
+            prefixes = {}
+            for item in items:
+                by_category.setdefault(item['category'], []).append(item)
+                for token in tokenize(item['name']):
+                    for end in range(1, min(len(token), MAX_PREFIX) + 1):
+                        prefixes.setdefault(token[:end], set()).add(item['id'])
+            by_name = {item['name'].lower(): item for item in items}
+            self._index = ({item['id']: item for item in items}, by_name, by_category, prefixes)
+            self.items = items
+            self.version = version
+            return True
+
+    def get(self, item_id):
+        return self._index[0].get(item_id)
+
+    def find(self, name):
+        """Case-insensitive lookup by name"""
+        return self._index[1].get(name.strip().lower())
+
+    def categories(self):
+        return sorted(self._index[2])
+
+    def search(self, query="", category=None):
+        """Items whose name has a word starting with every query token, in ID order"""
+        by_id, _, by_category, prefixes = self._index  # One snapshot for the whole query
+        tokens = tokenize(query)
+        if not tokens:
+            return by_category.get(category, []) if category else tuple(by_id.values())
+
+        matches = None
+        for token in tokens:
+            ids = prefixes.get(token[:MAX_PREFIX], set())
+            if len(token) > MAX_PREFIX:
+                ids = {i for i in ids if any(t.startswith(token) for t in tokenize(by_id[i]['name']))}
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        return [
+            by_id[i] for i in sorted(matches)
+            if not category or by_id[i]['category'] == category
+        ]
+
+    def _edit(self, sql, params):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(sql, params)
+                self._conn.execute("UPDATE menu_version SET version = version + 1")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.sync()
+        return cur
+
+    def add(self, name, price, category=DEFAULT_CATEGORY):
+        """Add an item; raises ValueError if the name is taken"""
+        name = name.strip()
+        if self.find(name):
+            raise ValueError(f"{name} already exists")
+        try:
+            cur = self._edit(
+                "INSERT INTO menu_items (name, price, category) VALUES (?, ?, ?)",
+                (name, price, category.strip() or DEFAULT_CATEGORY)
+            )
+        except sqlite3.IntegrityError:
+            # Added by another process since our last sync
+            raise ValueError(f"{name} already exists")
+        return self.get(cur.lastrowid)
+
+    def update_price(self, item_id, price):
+        self._edit("UPDATE menu_items SET price = ? WHERE id = ?", (price, item_id))
+
+    def delete(self, item_id):
+        self._edit("DELETE FROM menu_items WHERE id = ?", (item_id,))
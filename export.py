@@ -0,0 +1,145 @@
+import csv
+import datetime
+import io
+import tempfile
+
+from backends import LOG_HEADER
+
+CHUNK_ROWS = 1000  # Rows per ranged read / journal page, and per Parquet row group
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+INT_COLUMNS = {"Transaction ID", "Total Amount", "Option 1", "Option 2", "Option 3", "Amount Paid"}
+
+
+def journal_chunks(journal, chunk_rows=CHUNK_ROWS):
+    """Logged rows from the local journal, chunk_rows at a time"""
+    after_seq = 0
+    while True:
+        rows = journal.sheet_rows(after_seq, chunk_rows)
+        if not rows:
+            return
+        yield [row for _, row in rows]
+        after_seq = rows[-1][0]
+
+
+def sheet_chunks(sheet, api=None, chunk_rows=CHUNK_ROWS, start=2, width=len(LOG_HEADER)):
+    """Rows of a worksheet via ranged reads (A2:I1001, A1002:I2001, ...), from row `start`"""
+    last_column = chr(ord('A') + width - 1)
+    while True:
+        end = start + chunk_rows - 1
+        range_name = f"'{sheet.title}'!A{start}:{last_column}{end}"
+        params = {'valueRenderOption': 'UNFORMATTED_VALUE'}
+        if api:
+            response = api.call(sheet.spreadsheet.values_get, range_name, params=params)
+        else:
+            response = sheet.spreadsheet.values_get(range_name, params=params)
+        values = response.get('values', [])
+        if not values:
+            return
+        # The API trims trailing empty cells
+        yield [row + [""] * (width - len(row)) for row in values]
+        if len(values) < chunk_rows:
+            return
+        start = end + 1
+
+
+def normalize_id(value):
+    """Cell value as a stripped string; UNFORMATTED_VALUE returns numbers typed in by hand as floats"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def between(chunks, start=None, end=None):
+    """Keep rows whose timestamp is within [start, end]
+
+    Every chunk is read: append order is not time order once old rows are
+    backfilled or imported, so a later chunk can still hold rows in range.
+    """
+    low = start.strftime(TIMESTAMP_FORMAT) if start else None
+    high = end.strftime(TIMESTAMP_FORMAT) if end else None
+    for chunk in chunks:
+        kept = [
+            row for row in chunk
+            if (low is None or str(row[1]) >= low) and (high is None or str(row[1]) <= high)
+        ]
+        if kept:
+            yield kept
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp_or_none(value):
+    try:
+        return datetime.datetime.strptime(str(value), TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def write_csv(chunks, f):
+    """Stream chunks into a binary file as UTF-8 CSV; returns the row count"""
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(LOG_HEADER)
+    count = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        count += len(chunk)
+    text.flush()
+    text.detach()
+    return count
+
+
+def write_parquet(chunks, f):
+    """Stream chunks into a binary file as typed Parquet, one row group per chunk; returns the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = []
+    for name in LOG_HEADER:
+        if name in INT_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name == "Timestamp":
+            fields.append(pa.field(name, pa.timestamp("s")))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    schema = pa.schema(fields)
+
+    count = 0
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in chunks:
+            columns = []
+            for index, name in enumerate(LOG_HEADER):
+                values = [row[index] for row in chunk]
+                if name in INT_COLUMNS:
+                    values = [_int_or_none(v) for v in values]
+                elif name == "Timestamp":
+                    values = [_timestamp_or_none(v) for v in values]
+                else:
+                    values = [str(v) for v in values]
+                columns.append(values)
+            writer.write_table(pa.table(columns, schema=schema))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet}
+
+
+def export(chunks, fmt="csv"):
+    """Write chunks to a temporary file; returns (file rewound to the start, row count)
+
+    Only one chunk is held in memory while writing. The file is deleted once closed.
+    """
+    f = tempfile.TemporaryFile()
+    try:
+        count = WRITERS[fmt](chunks, f)
+    except Exception:
+        f.close()
+        raise
+    f.seek(0)
+    return f, count
@@ -0,0 +1,209 @@
+import itertools
+import json
+import random
+import threading
+import time
+
+import gspread
+import requests
+
+_ids = itertools.count(1)
+
+
+def _api_error(code, message, status):
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({'error': {'code': code, 'message': message, 'status': status}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+def quota_error():
+    """An APIError shaped like the one gspread raises for HTTP 429"""
+    return _api_error(429, 'Quota exceeded (fake)', 'RESOURCE_EXHAUSTED')
+
+
+def _numeric(value):
+    # get_all_records() converts numeric-looking cells the way gspread does
+    if isinstance(value, str):
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+    return value
+
+
+class FakeClient:
+    """In-process stand-in for the parts of gspread the app uses
+
+    Every API call sleeps `latency` seconds and fails with a 429 APIError at
+    `error_rate`, so the logging path can be load-tested without a network.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise quota_error()
+
+    def create(self, title):
+        self._call()
+        spreadsheet = FakeSpreadsheet(self, title)
+        self._spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    def open(self, title):
+        self._call()
+        for spreadsheet in self._spreadsheets.values():
+            if spreadsheet.title == title:
+                return spreadsheet
+        raise gspread.SpreadsheetNotFound(title)
+
+    def open_by_key(self, key):
+        self._call()
+        try:
+            return self._spreadsheets[key]
+        except KeyError:
+            raise gspread.SpreadsheetNotFound(key)
+
+    def list_spreadsheet_files(self):
+        self._call()
+        return [{'id': s.id, 'name': s.title} for s in self._spreadsheets.values()]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title):
+        self.client = client
+        self.id = f"fake-{next(_ids)}"
+        self.title = title
+        self._worksheets = [FakeWorksheet(self, "Sheet1", 0)]
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def share(self, *args, **kwargs):
+        self.client._call()
+
+    def worksheet(self, title):
+        self.client._call()
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise gspread.WorksheetNotFound(title)
+
+    def worksheets(self):
+        self.client._call()
+        return list(self._worksheets)
+
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        self.client._call()
+        if any(worksheet.title == title for worksheet in self._worksheets):
+            raise _api_error(400, f'A sheet with the name "{title}" already exists (fake)', 'INVALID_ARGUMENT')
+        worksheet = FakeWorksheet(self, title, len(self._worksheets), rows)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def fetch_sheet_metadata(self, params=None):
+        self.client._call()
+        return {
+            'properties': {'title': self.title},
+            'sheets': [
+                {'properties': {
+                    'sheetId': w.id,
+                    'title': w.title,
+                    'gridProperties': {'rowCount': w.row_count, 'columnCount': w.col_count},
+                }}
+                for w in self._worksheets
+            ],
+        }
+
+    def batch_update(self, body):
+        """Supports the appendCells requests the replicator sends"""
+        self.client._call()
+        by_id = {w.id: w for w in self._worksheets}
+        for request in body['requests']:
+            append = request['appendCells']
+            rows = [
+                [next(iter(cell['userEnteredValue'].values())) for cell in row['values']]
+                for row in append['rows']
+            ]
+            by_id[append['sheetId']]._extend(rows)
+        return {'replies': [{} for _ in body['requests']]}
+
+    def values_get(self, range_name, params=None):
+        """Ranged read, e.g. "'Sheet1'!A2:I501" """
+        self.client._call()
+        title, _, cells = range_name.rpartition('!')
+        worksheet = next(w for w in self._worksheets if w.title == title.strip("'"))
+        start, _, end = cells.partition(':')
+        first = int(''.join(c for c in start if c.isdigit()) or 1)
+        last = int(''.join(c for c in end if c.isdigit()) or len(worksheet._rows))
+        return {'range': range_name, 'values': worksheet._rows[first - 1:last]}
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id, rows=1000, cols=26):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.col_count = cols
+        self._grid_rows = rows
+        self._rows = []
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.spreadsheet.client
+
+    @property
+    def row_count(self):
+        return max(self._grid_rows, len(self._rows))
+
+    def _extend(self, rows):
+        with self._lock:
+            self._rows.extend([list(row) for row in rows])
+
+    def append_row(self, values, value_input_option="RAW", **kwargs):
+        self.client._call()
+        self._extend([values])
+
+    def append_rows(self, values, value_input_option="RAW", **kwargs):
+        self.client._call()
+        self._extend(values)
+
+    def insert_row(self, values, index=1, value_input_option="RAW", **kwargs):
+        self.client._call()
+        with self._lock:
+            self._rows.insert(index - 1, list(values))
+
+    def get_all_values(self):
+        self.client._call()
+        return [list(row) for row in self._rows]
+
+    def get_all_records(self):
+        self.client._call()
+        if not self._rows:
+            return []
+        header = self._rows[0]
+        return [dict(zip(header, map(_numeric, row))) for row in self._rows[1:]]
+
+    def get(self, range_name=None):
+        if range_name:
+            return self.spreadsheet.values_get(f"'{self.title}'!{range_name}").get('values', [])
+        self.client._call()
+        return [list(row) for row in self._rows]
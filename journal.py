@@ -0,0 +1,368 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+
+SERVER_SLOTS = 1000  # Transaction IDs are sequence * SERVER_SLOTS + server number
+
+
+class Journal:
+    """Append-only local transaction journal (SQLite in WAL mode)"""
+
+    def __init__(self, path, server_id=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL makes every commit fsync the WAL before returning
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                transaction_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                amount_paid INTEGER NOT NULL,
+                change INTEGER NOT NULL,
+                items TEXT NOT NULL,
+                sheet_row TEXT NOT NULL,
+                synced INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_unsynced ON transactions (synced, seq)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_id ON transactions (transaction_id)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS line_items (
+                seq INTEGER NOT NULL REFERENCES transactions (seq),
+                transaction_id TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                unit_price INTEGER NOT NULL,
+                qty INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_line_items_seq ON line_items (seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_line_items_item ON line_items (item_id)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        # Replication claims; added in place to journals created before them
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(transactions)")}
+        if 'claimed_by' not in columns:
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN claimed_by TEXT")
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN claimed_until REAL NOT NULL DEFAULT 0")
+        # Continue after any IDs already journaled before the counter existed
+        self._conn.execute(
+            "INSERT OR IGNORE INTO counters (name, value) "
+            "SELECT 'transaction_id', COALESCE(MAX(CAST(transaction_id AS INTEGER)), 0) FROM transactions"
+        )
+        # This server's number, the last digits of every ID it issues, so servers logging to the
+        # same sheet never issue the same ID. Configure it to rule out two random picks colliding.
+        if server_id is not None:
+            if not 0 <= int(server_id) < SERVER_SLOTS:
+                raise ValueError(f"server_id must be between 0 and {SERVER_SLOTS - 1}")
+            self._conn.execute(
+                "INSERT INTO counters (name, value) VALUES ('server_id', ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                (int(server_id),)
+            )
+        else:
+            picked = random.randrange(1, SERVER_SLOTS)
+            if self._conn.execute(
+                "INSERT OR IGNORE INTO counters (name, value) VALUES ('server_id', ?)", (picked,)
+            ).rowcount:
+                print(f"WARNING: server_id is not set; picked {picked} at random. Servers logging to the same "
+                      f"sheet can pick the same number and issue clashing IDs; set a distinct server_id on each.")
+        self.server_id = self.counter('server_id')
+
+    def next_transaction_id(self):
+        """Allocate the next transaction ID; unique across sessions, processes sharing the file and servers"""
+        with self._lock:
+            # IMMEDIATE holds SQLite's write lock from the UPDATE to the SELECT, so concurrent
+            # processes never see the same value (no UPDATE ... RETURNING before SQLite 3.35)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'transaction_id'")
+                value = self._conn.execute(
+                    "SELECT value FROM counters WHERE name = 'transaction_id'"
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return value * SERVER_SLOTS + self.server_id
+
+    def counter(self, name, default=0):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def known_ids(self, transaction_ids):
+        """The subset of transaction IDs already journaled"""
+        ids = [str(tid) for tid in transaction_ids]
+        known = set()
+        with self._lock:
+            # Stay under SQLite's host-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                known.update(row[0] for row in self._conn.execute(
+                    "SELECT transaction_id FROM transactions WHERE transaction_id IN (%s)"
+                    % ", ".join("?" for _ in chunk),
+                    chunk
+                ))
+        return known
+
+    def known_sales(self, transaction_ids):
+        """(transaction ID, timestamp) of every journaled sale with one of the given IDs"""
+        ids = [str(tid) for tid in transaction_ids]
+        known = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                known.update(self._conn.execute(
+                    "SELECT transaction_id, timestamp FROM transactions WHERE transaction_id IN (%s)"
+                    % ", ".join("?" for _ in chunk),
+                    chunk
+                ))
+        return known
+
+    def import_synced(self, entries, counters):
+        """Record sales read back from the sheet, already replicated, and advance counters
+
+        entries are (transaction, sheet_row) pairs as for append(). The
+        transaction ID counter is raised so new IDs come after every imported
+        ID, and the `counters` dict (e.g. read positions) is saved in the same
+        commit.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for transaction, sheet_row in entries:
+                    cur = self._conn.execute(
+                        "INSERT INTO transactions "
+                        "(transaction_id, timestamp, total, amount_paid, change, items, sheet_row, synced) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                        (
+                            str(transaction['id']),
+                            transaction['time'],
+                            transaction['total'],
+                            transaction['amount_paid'],
+                            transaction['change'],
+                            json.dumps(transaction['items']),
+                            json.dumps(sheet_row),
+                        )
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO line_items (seq, transaction_id, item_id, unit_price, qty) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (cur.lastrowid, str(transaction['id']), item['id'], item['price'], item['qty'])
+                            for item in transaction['items']
+                        ]
+                    )
+                numeric = [int(t['id']) for t, _ in entries if str(t['id']).isdigit()]
+                if numeric:
+                    self._conn.execute(
+                        "UPDATE counters SET value = MAX(value, ?) WHERE name = 'transaction_id'",
+                        (max(numeric) // SERVER_SLOTS,)
+                    )
+                self._conn.executemany(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    list(counters.items())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def append(self, transaction, sheet_row):
+        """Record one completed sale and its line items; returns its journal sequence number"""
+        with self._lock:
+            # Header and line items commit together (one fsync)
+            self._conn.execute("BEGIN")
+            try:
+                cur = self._conn.execute(
+                    "INSERT INTO transactions "
+                    "(transaction_id, timestamp, total, amount_paid, change, items, sheet_row) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        str(transaction['id']),
+                        transaction['time'],
+                        transaction['total'],
+                        transaction['amount_paid'],
+                        transaction['change'],
+                        json.dumps(transaction['items']),
+                        json.dumps(sheet_row),
+                    )
+                )
+                seq = cur.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO line_items (seq, transaction_id, item_id, unit_price, qty) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (seq, str(transaction['id']), item['id'], item['price'], item['qty'])
+                        for item in transaction['items']
+                    ]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return seq
+
+    def claim(self, owner, limit=500, lease=300.0):
+        """Claim the oldest rows not yet replicated, as (seq, sheet_row, line_item_rows)
+
+        Rows claimed by another owner are skipped until its lease runs out, so
+        writers in several processes sharing the journal file never send the
+        same row. Claims end when the rows are marked synced or released.
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock before the SELECT, so two processes cannot claim the same rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seqs = [row[0] for row in self._conn.execute(
+                    "SELECT seq FROM transactions "
+                    "WHERE synced = 0 AND (claimed_until < ? OR claimed_by = ?) ORDER BY seq LIMIT ?",
+                    (now, owner, limit)
+                )]
+                self._conn.executemany(
+                    "UPDATE transactions SET claimed_by = ?, claimed_until = ? WHERE seq = ?",
+                    [(owner, now + lease, seq) for seq in seqs]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.entries(seqs)
+
+    def release(self, seqs):
+        """Give claimed rows back, e.g. after a failed append, so any writer can retry them"""
+        if not seqs:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE transactions SET claimed_by = NULL, claimed_until = 0 WHERE seq = ?",
+                    [(seq,) for seq in seqs]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def ids(self):
+        """Every journaled (seq, transaction_id, synced), in journal order"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, transaction_id, synced FROM transactions ORDER BY seq"
+            ).fetchall()
+
+    def entries(self, seqs):
+        """Rows for the given sequence numbers as (seq, sheet_row, line_item_rows), like claim()"""
+        seqs = sorted(seqs)
+        result = []
+        with self._lock:
+            # Stay under SQLite's host-parameter limit
+            for start in range(0, len(seqs), 500):
+                chunk = seqs[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT seq, sheet_row FROM transactions WHERE seq IN ({placeholders}) ORDER BY seq",
+                    chunk
+                ).fetchall()
+                lines = {}
+                for seq, tid, item_id, price, qty in self._conn.execute(
+                    "SELECT seq, transaction_id, item_id, unit_price, qty FROM line_items "
+                    f"WHERE seq IN ({placeholders}) ORDER BY rowid",
+                    chunk
+                ):
+                    lines.setdefault(seq, []).append([int(tid) if tid.isdigit() else tid, item_id, price, qty])
+                result.extend((seq, json.loads(row), lines.get(seq, [])) for seq, row in rows)
+        return result
+
+    def sheet_rows(self, after_seq=0, limit=1000):
+        """Logged rows as (seq, sheet_row) in journal order, one page at a time"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, sheet_row FROM transactions WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after_seq, limit)
+            ).fetchall()
+        return [(seq, json.loads(row)) for seq, row in rows]
+
+    def line_items(self, item_id=None):
+        """Typed line-item rows (transaction_id, item_id, unit_price, qty), optionally for one item"""
+        query = "SELECT transaction_id, item_id, unit_price, qty FROM line_items"
+        params = ()
+        if item_id is not None:
+            query += " WHERE item_id = ?"
+            params = (item_id,)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY rowid", params).fetchall()
+
+    def unsynced_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE synced = 0"
+            ).fetchone()[0]
+
+    def synced_count(self):
+        """High-water mark: rows known to be in Google Sheets"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE synced = 1"
+            ).fetchone()[0]
+
+    def mark_synced(self, seqs):
+        if not seqs:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE transactions SET synced = 1 WHERE seq = ?",
+                    [(seq,) for seq in seqs]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def transactions(self, after_seq=0):
+        """Journaled sales newer than after_seq, in the shape used by the pages"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, transaction_id, timestamp, items, total, amount_paid, change, sheet_row "
+                "FROM transactions WHERE seq > ? ORDER BY seq",
+                (after_seq,)
+            ).fetchall()
+        return [
+            {
+                'seq': seq,
+                'id': int(tid) if tid.isdigit() else tid,
+                'time': ts,
+                'items': json.loads(items),
+                'total': total,
+                'amount_paid': paid,
+                'change': change,
+                # "Selected Option" as logged to the sheet: 1-3 or "Manual"
+                'option': json.loads(sheet_row)[7],
+            }
+            for seq, tid, ts, items, total, paid, change, sheet_row in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
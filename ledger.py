@@ -0,0 +1,189 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cart import LineItem
+
+
+class TransactionFrame:
+    """Append-only columnar store of completed transactions with running totals"""
+
+    NUMERIC_COLUMNS = {
+        'id': np.int64,
+        'time': 'datetime64[s]',
+        'items': np.int64,
+        'total': np.int64,
+        'paid': np.int64,
+        'change': np.int64,
+    }
+
+    def __init__(self, capacity=1024):
+        self._lock = threading.Lock()
+        self._size = 0
+        self._columns = {
+            name: np.empty(capacity, dtype=dtype) for name, dtype in self.NUMERIC_COLUMNS.items()
+        }
+        self._details = []  # Frozen LineItem tuples, kept out of the numeric columns
+        self._id_index = {}  # Transaction ID -> row position
+        self._item_index = {}  # Item name -> ascending row positions
+        self._time_sorted = True  # False once a row arrives out of time order
+        self._time_order = None  # Row positions in time order, once rows are out of order
+        self._order_times = None  # Times along _time_order, for binary search
+        self._unordered = []  # Positions appended since _time_order was last updated
+        self.last_seq = 0  # Highest journal sequence already loaded
+        self.total_revenue = 0
+        self.total_items = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        for name, column in self._columns.items():
+            grown = np.empty(len(column) * 2, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def append(self, transaction):
+        """Add one transaction dict (as produced by Journal.transactions)"""
+        with self._lock:
+            self._append(transaction)
+
+    def _append(self, transaction):
+        if transaction.get('seq', 0) and transaction['seq'] <= self.last_seq:
+            return  # Already loaded
+        if self._size == len(self._columns['id']):
+            self._grow()
+
+        qty = sum(item['qty'] for item in transaction['items'])
+        i = self._size
+        timestamp = np.datetime64(transaction['time'].replace(' ', 'T'), 's')
+        if self._time_sorted and i and timestamp < self._columns['time'][i - 1]:
+            # Everything before this row is still in order
+            self._time_sorted = False
+            self._time_order = np.arange(i)
+            self._order_times = self._columns['time'][:i].copy()
+        if not self._time_sorted:
+            self._unordered.append(i)
+
+        self._columns['id'][i] = transaction['id']
+        self._columns['time'][i] = timestamp
+        self._columns['items'][i] = qty
+        self._columns['total'][i] = transaction['total']
+        self._columns['paid'][i] = transaction['amount_paid']
+        self._columns['change'][i] = transaction['change']
+        self._details.append(tuple(
+            LineItem(item['id'], item['name'], item['price'], item['qty']) for item in transaction['items']
+        ))
+        self._id_index[transaction['id']] = i
+        for name in {item['name'] for item in transaction['items']}:
+            self._item_index.setdefault(name, []).append(i)
+        self._size += 1
+
+        self.last_seq = max(self.last_seq, transaction.get('seq', 0))
+        self.total_revenue += transaction['total']
+        self.total_items += qty
+
+    def sync(self, journal):
+        """Load only journal rows appended since the last sync; returns the new rows"""
+        with self._lock:
+            new = journal.transactions(after_seq=self.last_seq)
+            for transaction in new:
+                self._append(transaction)
+            return new
+
+    def column(self, name):
+        """Read-only view of one column"""
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def items_at(self, position):
+        return self._details[position]
+
+    def find(self, transaction_id):
+        """Row position of a transaction ID, or None"""
+        return self._id_index.get(transaction_id)
+
+    def item_names(self):
+        return sorted(self._item_index)
+
+    def _by_time(self):
+        """Row positions in time order"""
+        if self._time_sorted:
+            return np.arange(self._size)
+        if self._unordered:
+            # Merge new rows into the cached order instead of re-sorting everything
+            new = np.asarray(self._unordered, dtype=np.int64)
+            new_times = self._columns['time'][new]
+            by_time = np.argsort(new_times, kind='stable')
+            new, new_times = new[by_time], new_times[by_time]
+            at = np.searchsorted(self._order_times, new_times, side='right')
+            self._time_order = np.insert(self._time_order, at, new)
+            self._order_times = np.insert(self._order_times, at, new_times)
+            self._unordered = []
+        return self._time_order
+
+    def filter(self, start=None, end=None, min_total=None, max_total=None, item=None):
+        """Row positions matching all given bounds, in time order
+
+        Without an item filter the date range is located by binary search over
+        the time order; with one, only that item's posting list is examined.
+        """
+        start = None if start is None else np.datetime64(start, 's')
+        end = None if end is None else np.datetime64(end, 's')
+        with self._lock:
+            times = self._columns['time'][:self._size]
+            if item is not None:
+                positions = np.asarray(self._item_index.get(item, []), dtype=np.int64)
+                if not self._time_sorted:
+                    positions = positions[np.argsort(times[positions], kind='stable')]
+                mask = np.ones(len(positions), dtype=bool)
+                if start is not None:
+                    mask &= times[positions] >= start
+                if end is not None:
+                    mask &= times[positions] <= end
+                positions = positions[mask]
+            else:
+                order = self._by_time()
+                if not self._time_sorted:
+                    times = self._order_times
+                lo = 0 if start is None else np.searchsorted(times, start, side='left')
+                hi = len(order) if end is None else np.searchsorted(times, end, side='right')
+                positions = order[lo:hi]
+
+            if min_total is not None or max_total is not None:
+                totals = self._columns['total'][positions]
+                mask = np.ones(len(positions), dtype=bool)
+                if min_total is not None:
+                    mask &= totals >= min_total
+                if max_total is not None:
+                    mask &= totals <= max_total
+                positions = positions[mask]
+            return positions
+
+    def rows(self, positions):
+        """DataFrame for the given row positions, indexed by position"""
+        positions = np.asarray(positions, dtype=np.int64)
+        return pd.DataFrame({
+            'ID': self._columns['id'][positions],
+            'Time': self._columns['time'][positions],
+            'Items': self._columns['items'][positions],
+            'Total': self._columns['total'][positions],
+            'Paid': self._columns['paid'][positions],
+            'Change': self._columns['change'][positions],
+        }, index=positions)
+
+    def page(self, page, page_size, positions=None, newest_first=True):
+        """DataFrame for one page of rows; cost depends on page_size, not history size"""
+        with self._lock:
+            if positions is None:
+                positions = self._by_time()
+            if newest_first:
+                stop = max(len(positions) - page * page_size, 0)
+                start = max(stop - page_size, 0)
+                selected = positions[start:stop][::-1]
+            else:
+                start = min(page * page_size, len(positions))
+                selected = positions[start:start + page_size]
+            return self.rows(selected)
@@ -0,0 +1,167 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Latency bucket upper bounds in seconds (Prometheus `le` labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 1024  # Per-series window for the percentiles on the metrics page
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count', 'recent')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class Metrics:
+    """In-process counters and latency histograms, safe to share between sessions and threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time a block into the `<name>_seconds` histogram; failures also count `<name>_errors_total`"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of span()"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """[{name, labels, count, mean, p50, p95, p99, max}] in seconds, over recent samples"""
+        with self._lock:
+            items = [(key, h.count, h.sum, list(h.recent)) for key, h in self._histograms.items()]
+        rows = []
+        for (name, labels), count, total, recent in sorted(items):
+            samples = np.asarray(recent)
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            rows.append({
+                'name': name,
+                'labels': ", ".join(f"{k}={v}" for k, v in labels),
+                'count': count,
+                'mean': total / count,
+                'p50': p50,
+                'p95': p95,
+                'p99': p99,
+                'max': samples.max(),
+            })
+        return rows
+
+    def counters(self):
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [
+            {'name': name, 'labels': ", ".join(f"{k}={v}" for k, v in labels), 'value': value}
+            for (name, labels), value in items
+        ]
+
+    def prometheus(self, prefix="pos_"):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+        for (name, labels), counts, total, count in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {count}")
+        lines.append(f"# TYPE {prefix}process_start_time_seconds gauge")
+        lines.append(f"{prefix}process_start_time_seconds {self.started}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics, port, host="0.0.0.0"):
+    """Expose /metrics for a Prometheus scraper on a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
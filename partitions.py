@@ -0,0 +1,127 @@
+import datetime
+import threading
+
+import gspread
+
+from backends import LINE_ITEMS_HEADER, LOG_HEADER, ensure_header
+
+INDEX_SHEET = "Index"
+INDEX_HEADER = ["Period", "Log Sheet", "Line Items Sheet", "Created"]
+GRANULARITIES = {'year': 4, 'month': 7, 'day': 10}  # Length of the "YYYY-MM-DD" prefix naming a period
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class SheetPartitions:
+    """Per-period log and line-item worksheets, listed in an index sheet and created on first use
+
+    A row belongs to the period named by the prefix of its timestamp, e.g.
+    "2026-10" for monthly partitions, whose tabs are "Log 2026-10" and
+    "Line Items 2026-10".
+    """
+
+    def __init__(self, get_spreadsheet, api=None, granularity="month", log_prefix="Log",
+                 line_prefix="Line Items"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity '{granularity}'; use one of {', '.join(GRANULARITIES)}")
+        self.get_spreadsheet = get_spreadsheet
+        self.api = api
+        self.granularity = granularity
+        self.log_prefix = log_prefix
+        self.line_prefix = line_prefix
+        self._prefix_length = GRANULARITIES[granularity]
+        self._lock = threading.RLock()
+        self._index_sheet = None
+        self._index = None  # Period -> (log title, line-item title)
+        self._sheets = {}  # Title -> worksheet
+
+    def _call(self, fn, *args, **kwargs):
+        if self.api:
+            return self.api.call(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def period(self, timestamp):
+        """Period of a "YYYY-MM-DD HH:MM:SS" string or a datetime"""
+        if isinstance(timestamp, (datetime.date, datetime.datetime)):
+            timestamp = timestamp.strftime(TIMESTAMP_FORMAT)
+        return str(timestamp)[:self._prefix_length]
+
+    def _read_index(self):
+        spreadsheet = self.get_spreadsheet()
+        if self._index_sheet is None:
+            try:
+                sheet = self._call(spreadsheet.worksheet, INDEX_SHEET)
+            except gspread.WorksheetNotFound:
+                sheet = self._open(INDEX_SHEET, INDEX_HEADER, rows=100)
+            else:
+                # Rows are read from A2 on, so a header lost to a crash after creation would hide one
+                ensure_header(sheet, INDEX_HEADER, self.api)
+            self._index_sheet = sheet
+        values = self._call(spreadsheet.values_get, f"'{INDEX_SHEET}'!A2:C").get('values', [])
+        # Concurrent creators may have listed a period twice; the first row wins
+        index = {}
+        for row in values:
+            if len(row) >= 3:
+                index.setdefault(str(row[0]), (row[1], row[2]))
+        self._index = index
+        return index
+
+    def _load(self):
+        return self._index if self._index is not None else self._read_index()
+
+    def reload(self):
+        """Re-read the index to pick up periods other servers created; one ranged read"""
+        with self._lock:
+            self._read_index()
+
+    def periods(self):
+        with self._lock:
+            return sorted(self._load())
+
+    def periods_between(self, start=None, end=None):
+        """Indexed periods overlapping [start, end] (datetimes), in order"""
+        low = self.period(start) if start else None
+        high = self.period(end) if end else None
+        return [p for p in self.periods() if (low is None or p >= low) and (high is None or p <= high)]
+
+    def sheets(self, period, create=True):
+        """(log worksheet, line-item worksheet) for a period; None if it does not exist and create is False"""
+        with self._lock:
+            titles = self._load().get(period)
+            if titles is None:
+                if not create:
+                    return None
+                titles = self._create(period)
+            return tuple(self._worksheet(title) for title in titles)
+
+    def _worksheet(self, title):
+        sheet = self._sheets.get(title)
+        if sheet is None:
+            sheet = self._sheets[title] = self._call(self.get_spreadsheet().worksheet, title)
+        return sheet
+
+    def _open(self, title, header, rows):
+        """Worksheet `title` starting with its header row, created if missing"""
+        spreadsheet = self.get_spreadsheet()
+        try:
+            sheet = self._call(spreadsheet.add_worksheet, title, rows=rows, cols=len(header))
+        except gspread.exceptions.APIError:
+            # Another server created it first, or a crash left it without its header
+            sheet = self._call(spreadsheet.worksheet, title)
+        ensure_header(sheet, header, self.api)
+        return sheet
+
+    def _create(self, period):
+        titles = (f"{self.log_prefix} {period}", f"{self.line_prefix} {period}")
+        for title, header in zip(titles, (LOG_HEADER, LINE_ITEMS_HEADER)):
+            self._sheets[title] = self._open(title, header, rows=1000)
+        created = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+        self._call(self._index_sheet.append_row, [period, *titles, created])
+        self._index[period] = titles
+        return titles
+
+    def invalidate(self):
+        """Forget cached worksheets and the index, e.g. after a tab was deleted"""
+        with self._lock:
+            self._index_sheet = None
+            self._index = None
+            self._sheets = {}
@@ -0,0 +1,206 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Common Indonesian banknotes
+DENOMINATIONS = (1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+# Large denomination option: (total upper bound, amount); above the last tier round up to the next step
+LARGE_TIERS = ((30000, 50000), (70000, 100000))
+LARGE_STEP = 50000
+
+# Middle option: (total upper bound (exclusive), rounding step)
+MID_TIERS = ((10000, 500), (50000, 5000))
+MID_STEP = 10000
+
+# Increment used to fill duplicate options: (total upper bound (exclusive), increment)
+FILL_TIERS = ((30000, 5000),)
+FILL_STEP = 10000
+
+
+def _tier(total, tiers, default, inclusive=False):
+    for bound, value in tiers:
+        if total <= bound if inclusive else total < bound:
+            return value
+    return default
+
+
+@lru_cache(maxsize=4096)
+def _payment_options(total, denominations):
+    # Phase 1: Generate core options
+    options = []
+
+    # 1. Minimal convenient amount
+    min_option = next((d for d in denominations if d >= total), total + 1000)
+    options.append(min_option)
+
+    # 2. Practical large denomination option
+    large_option = _tier(total, LARGE_TIERS, None, inclusive=True)
+    if large_option is None:
+        # Round up to next 50000
+        large_option = ((total // LARGE_STEP) + 1) * LARGE_STEP
+    options.append(large_option)
+
+    # 3. Middle option - psychologically comfortable amount
+    bound, step = MID_TIERS[0]
+    if total < bound:
+        # Round to nearest 500
+        mid_option = round(total / step) * step
+        if mid_option <= total:
+            mid_option += step
+    else:
+        # Round up to the next step
+        step = _tier(total, MID_TIERS[1:], MID_STEP)
+        mid_option = ((total // step) + 1) * step
+    options.append(mid_option)
+
+    # Ensure all options are unique and sorted
+    unique_options = sorted(set(options))
+
+    # Fill in missing options if we don't have 3 distinct
+    increment = _tier(total, FILL_TIERS, FILL_STEP)
+    while len(unique_options) < 3:
+        unique_options.append(unique_options[-1] + increment)
+
+    # Return exactly 3 options sorted ascending
+    return tuple(sorted(unique_options[:3]))
+
+
+def payment_options(total, denominations=DENOMINATIONS):
+    """Three suggested tender amounts for a total, ascending; results are memoized"""
+    return list(_payment_options(total, tuple(sorted(denominations))))
+
+
+def payment_options_batch(totals, denominations=DENOMINATIONS):
+    """Vectorized payment_options: returns an (n, 3) int64 array, row i matching payment_options(totals[i])"""
+    totals = np.asarray(totals, dtype=np.int64)
+    denoms = np.asarray(sorted(denominations), dtype=np.int64)
+
+    # 1. Minimal convenient amount
+    index = np.searchsorted(denoms, totals, side='left')
+    min_option = np.where(
+        index < len(denoms), denoms[np.minimum(index, len(denoms) - 1)], totals + 1000
+    )
+
+    # 2. Practical large denomination option
+    large_option = ((totals // LARGE_STEP) + 1) * LARGE_STEP
+    for bound, amount in reversed(LARGE_TIERS):
+        large_option = np.where(totals <= bound, amount, large_option)
+
+    # 3. Middle option; np.round rounds half to even like Python's round()
+    mid_option = ((totals // MID_STEP) + 1) * MID_STEP
+    for bound, step in reversed(MID_TIERS[1:]):
+        mid_option = np.where(totals < bound, ((totals // step) + 1) * step, mid_option)
+    bound, step = MID_TIERS[0]
+    nearest = (np.round(totals / step) * step).astype(np.int64)
+    nearest = np.where(nearest <= totals, nearest + step, nearest)
+    mid_option = np.where(totals < bound, nearest, mid_option)
+
+    # Sort, then rebuild the scalar dedupe-and-fill rule per row
+    s = np.sort(np.stack([min_option, large_option, mid_option], axis=1), axis=1)
+    increment = np.full(len(totals), FILL_STEP, dtype=np.int64)
+    for bound, value in reversed(FILL_TIERS):
+        increment = np.where(totals < bound, value, increment)
+
+    first_new = s[:, 1] != s[:, 0]
+    second_new = s[:, 2] != s[:, 1]
+    # Distinct values in order, then pad by repeated increments from the last one
+    last = np.where(second_new, s[:, 2], np.where(first_new, s[:, 1], s[:, 0]))
+    distinct = 1 + first_new.astype(np.int64) + second_new.astype(np.int64)
+
+    result = np.empty((len(totals), 3), dtype=np.int64)
+    result[:, 0] = s[:, 0]
+    result[:, 1] = np.where(distinct >= 2, np.where(first_new, s[:, 1], s[:, 2]), last + increment)
+    result[:, 2] = np.where(distinct == 3, s[:, 2], np.where(distinct == 2, last + increment, last + 2 * increment))
+    return result
+
+
+# Notes and coins in the drawer, used for change-making
+CHANGE_DENOMINATIONS = (100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+class ChangeMaker:
+    """Minimum-note change making from a precomputed dynamic-programming table"""
+
+    def __init__(self, denominations=CHANGE_DENOMINATIONS, max_amount=2000000):
+        self.denominations = tuple(sorted(set(denominations)))
+        self.unit = int(np.gcd.reduce(np.asarray(self.denominations, dtype=np.int64)))
+        self.max_amount = max_amount
+        size = max_amount // self.unit + 1
+
+        # counts[a] = fewest pieces summing to a * unit; last[a] = a piece used in that optimum
+        unreachable = np.iinfo(np.int32).max
+        counts = np.full(size, unreachable, dtype=np.int32)
+        last = np.zeros(size, dtype=np.int32)
+        counts[0] = 0
+        for denomination in self.denominations:
+            step = denomination // self.unit
+            # Each block only depends on the block one step below, so update a step at a time
+            for start in range(step, size, step):
+                stop = min(start + step, size)
+                source = counts[start - step:stop - step]
+                # Unreachable sources stay unreachable (adding 1 would wrap to a negative count)
+                candidate = source + 1
+                better = (source != unreachable) & (candidate < counts[start:stop])
+                counts[start:stop][better] = candidate[better]
+                last[start:stop][better] = denomination
+        self._counts = counts
+        self._last = last
+        self._unreachable = unreachable
+
+    def notes(self, amount):
+        """Fewest notes/coins that make up amount, or None if it cannot be made"""
+        if amount < 0 or amount % self.unit:
+            return None
+        if amount > self.max_amount:
+            # Beyond the table: take the largest notes, then look up the remainder
+            top = self.denominations[-1]
+            extra = (amount - self.max_amount) // top + 1
+            rest = self.notes(amount - extra * top)
+            return None if rest is None else rest + extra
+        count = int(self._counts[amount // self.unit])
+        return None if count == self._unreachable else count
+
+    def breakdown(self, amount):
+        """[(denomination, count), ...] largest first, for a minimum-note amount"""
+        if self.notes(amount) is None:
+            return []
+        pieces = {}
+        top = self.denominations[-1]
+        while amount > self.max_amount:
+            pieces[top] = pieces.get(top, 0) + 1
+            amount -= top
+        while amount:
+            denomination = int(self._last[amount // self.unit])
+            if not denomination:
+                # No recorded piece: the remainder cannot be made
+                return []
+            pieces[denomination] = pieces.get(denomination, 0) + 1
+            amount -= denomination
+        return sorted(pieces.items(), reverse=True)
+
+    def best_tenders(self, total, extra=(), limit=3):
+        """Tender amounts ranked by notes handed over plus notes given back
+
+        Candidates are the exact total, the total rounded up to each denomination,
+        the total plus one of each denomination, and any extra amounts given.
+        Returns [(tender, paid_notes, change_notes), ...].
+        """
+        candidates = {total, *extra}
+        for denomination in self.denominations:
+            candidates.add(-(-total // denomination) * denomination)
+            candidates.add(total + denomination)
+
+        ranked = []
+        for tender in candidates:
+            paid = self.notes(tender)
+            change = self.notes(tender - total)
+            if paid is None or change is None:
+                continue
+            ranked.append((paid + change, tender, paid, change))
+        ranked.sort()
+        return [(tender, paid, change) for _, tender, paid, change in ranked[:limit]]
+
+
+def format_breakdown(pieces):
+    return " + ".join(f"{count}×{denomination:,}" for denomination, count in pieces)
@@ -0,0 +1,185 @@
+"""Reconcile the local journal with the Google Sheets log and backfill missing rows
+
+    python reconcile.py --dry-run
+    python reconcile.py
+    python reconcile.py --include-pending   # only while the app is stopped
+
+Transaction IDs are read from column A of the log tab (and of every partition
+tab) into a hash table, so the diff is a single pass over each side. Rows the
+sheet is missing are appended through the log backend, `--batch-rows` per
+request, within the same request budget the app uses.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tomllib
+from collections import Counter
+
+import gspread
+
+from backends import LINE_ITEMS_SHEET, SHEET_NAME, SheetsBackend
+from export import normalize_id, sheet_chunks
+from journal import Journal
+from partitions import SheetPartitions
+from sheets_api import SheetsApi, service_account_info
+
+ID_CHUNK_ROWS = 10000  # Column-A rows per ranged read
+BACKFILL_ROWS = 1000  # Rows per backend append while backfilling
+
+_lock = threading.Lock()  # One reconciliation at a time per process
+
+
+def log_sheets(sheet, partitions=None):
+    """The log tab plus the log tab of every indexed partition"""
+    sheets = [sheet]
+    if partitions:
+        partitions.reload()
+        for period in partitions.periods():
+            tabs = partitions.sheets(period, create=False)
+            if tabs:
+                sheets.append(tabs[0])
+    return sheets
+
+
+def sheet_ids(sheets, api=None, chunk_rows=ID_CHUNK_ROWS):
+    """Transaction IDs on the given log tabs with their row counts; reads column A only"""
+    ids = Counter()
+    for sheet in sheets:
+        for chunk in sheet_chunks(sheet, api, chunk_rows, start=2, width=1):
+            ids.update(normalize_id(row[0]) for row in chunk if row[0] != "")
+    return ids
+
+
+def reconcile(journal, backend, sheets, api=None, batch_rows=BACKFILL_ROWS, include_pending=False,
+              dry_run=False, metrics=None):
+    """Diff journaled transactions against the sheet by ID and append the ones it is missing
+
+    Rows not replicated yet belong to the sheet writer and are only appended
+    with `include_pending`, which is safe only while no writer is running.
+    Pending rows found on the sheet already are marked synced so the writer
+    does not append them a second time. Returns a summary dict.
+    """
+    with _lock:
+        started = time.perf_counter()
+        # Journal first: a row marked synced by now was appended before the sheet is read
+        journaled = journal.ids()
+        on_sheet = sheet_ids(sheets, api)
+
+        missing = []  # Seqs to append
+        unmarked = []  # Seqs on the sheet but not marked synced
+        pending = 0  # Seqs left to the writer
+        local = set()
+        for seq, tid, synced in journaled:
+            tid = normalize_id(tid)
+            local.add(tid)
+            if tid in on_sheet:
+                if not synced:
+                    unmarked.append(seq)
+            elif synced or include_pending:
+                missing.append(seq)
+            else:
+                pending += 1
+
+        summary = {
+            'journal': len(journaled),
+            'sheet': sum(on_sheet.values()),
+            'missing': len(missing),
+            'pending': pending,
+            'unmarked': len(unmarked),
+            'sheet_only': len(on_sheet.keys() - local),
+            'duplicates': sum(count - 1 for count in on_sheet.values() if count > 1),
+            'backfilled': 0,
+            'requests': 0,
+            'dry_run': dry_run,
+        }
+        if not dry_run:
+            journal.mark_synced(unmarked)
+            for start in range(0, len(missing), batch_rows):
+                rows = journal.entries(missing[start:start + batch_rows])
+                backend.append(
+                    [row for _, row, _ in rows],
+                    [line for _, _, item_lines in rows for line in item_lines]
+                )
+                # Pending rows are replicated now; synced ones are unchanged
+                journal.mark_synced([seq for seq, _, _ in rows])
+                summary['backfilled'] += len(rows)
+                summary['requests'] += 1
+
+        summary['seconds'] = time.perf_counter() - started
+        if metrics:
+            metrics.observe("reconcile_seconds", summary['seconds'])
+            metrics.inc("reconcile_backfilled_total", summary['backfilled'])
+        return summary
+
+
+def describe(summary):
+    """Summary as short human-readable lines"""
+    lines = [f"{summary['journal']} journaled, {summary['sheet']} rows on the sheet"]
+    if summary['dry_run']:
+        lines.append(f"Missing from the sheet: {summary['missing']} (dry run, nothing written)")
+    else:
+        lines.append(f"Backfilled {summary['backfilled']} of {summary['missing']} missing rows "
+                     f"in {summary['requests']} request{'' if summary['requests'] == 1 else 's'}")
+    if summary['pending']:
+        lines.append(f"Still queued for the writer: {summary['pending']}")
+    if summary['unmarked']:
+        lines.append(f"Already on the sheet but not marked synced: {summary['unmarked']}")
+    if summary['sheet_only']:
+        lines.append(f"On the sheet but not journaled: {summary['sheet_only']}")
+    if summary['duplicates']:
+        lines.append(f"Duplicate rows on the sheet: {summary['duplicates']}")
+    lines.append(f"Took {summary['seconds']:.1f} s")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill transactions missing from the Google Sheets log")
+    parser.add_argument("--journal", default="pos_journal.db", help="Journal file written by app.py")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"),
+                        help="Streamlit secrets with gcp_service_account and the sheet settings")
+    parser.add_argument("--batch-rows", type=int, default=BACKFILL_ROWS, help="Rows per append request")
+    parser.add_argument("--include-pending", action="store_true",
+                        help="Also append rows the app has not replicated yet; only while the app is stopped")
+    parser.add_argument("--dry-run", action="store_true", help="Report the difference without writing")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.journal):
+        sys.exit(f"Journal not found: {args.journal}")
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+    if secrets.get("log_backend", "sheets") != "sheets":
+        sys.exit(f"log_backend is '{secrets['log_backend']}'; only a Google Sheets log can be reconciled")
+
+    api = SheetsApi(requests_per_minute=int(secrets.get("sheets_requests_per_minute", 60)))
+    client = gspread.service_account_from_dict(service_account_info(secrets["gcp_service_account"]))
+    if secrets.get("sheet_key"):
+        spreadsheet = api.call(client.open_by_key, secrets["sheet_key"])
+    else:
+        spreadsheet = api.call(client.open, SHEET_NAME)
+    try:
+        line_sheet = api.call(spreadsheet.worksheet, LINE_ITEMS_SHEET)
+    except gspread.WorksheetNotFound:
+        line_sheet = None
+
+    granularity = secrets.get("sheet_partition", "month")
+    partitions = None
+    if granularity != "none":
+        partitions = SheetPartitions(lambda: spreadsheet, api=api, granularity=granularity)
+    backend = SheetsBackend(lambda: spreadsheet.sheet1, lambda: line_sheet, api=api, partitions=partitions)
+
+    journal = Journal(args.journal)
+    try:
+        summary = reconcile(
+            journal, backend, log_sheets(spreadsheet.sheet1, partitions), api=api,
+            batch_rows=args.batch_rows, include_pending=args.include_pending, dry_run=args.dry_run
+        )
+    finally:
+        journal.close()
+    for line in describe(summary):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
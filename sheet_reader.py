@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import deque
+
+from backends import LINE_ITEMS_HEADER
+from export import CHUNK_ROWS, normalize_id, sheet_chunks
+from journal import SERVER_SLOTS
+
+# Journal counters: data rows of each worksheet already read ("<name>:<period>" for partitions)
+LOG_ROWS_READ = "sheet_log_rows_read"
+LINE_ROWS_READ = "sheet_line_rows_read"
+RECENT_PERIODS = 2  # Partitions re-read on every pass; older ones only until first read
+
+
+def parse_items(text):
+    """"Fried Rice x 1; Iced Tea x 2" -> [("Fried Rice", 1), ("Iced Tea", 2)]"""
+    items = []
+    for part in str(text).split(";"):
+        name, sep, qty = part.strip().rpartition(" x ")
+        if sep and qty.isdigit():
+            items.append((name, int(qty)))
+    return items
+
+
+def _whole(value):
+    """Whole-number cell value as int; None for blank, text or fractional cells"""
+    text = normalize_id(value)
+    return int(text) if text.lstrip("-").isdigit() else None
+
+
+class SheetReader:
+    """Pulls rows appended to the log sheet since the last read into the journal
+
+    Covers a fresh journal (e.g. a redeploy on an ephemeral disk) and other
+    servers logging to the same spreadsheet. Read positions are stored in the
+    journal next to the imported rows, so every pass is a ranged read of new
+    rows only. Rows already journaled are skipped: by ID for IDs issued per
+    server, by ID and time for the small per-session IDs of older logs, which
+    repeat. Rows with a blank or non-numeric ID, total or amount paid are
+    passed over and counted in `skipped`.
+    """
+
+    def __init__(self, journal, get_sheet, get_line_sheet=None, catalogue=None, api=None,
+                 interval=60.0, chunk_rows=CHUNK_ROWS, metrics=None, partitions=None):
+        self.journal = journal
+        self.get_sheet = get_sheet
+        self.get_line_sheet = get_line_sheet  # Optional; exact prices and item IDs
+        self.partitions = partitions  # Optional partitions.SheetPartitions, read after the tabs above
+        self.catalogue = catalogue  # Optional MenuCatalogue for item names and fallback prices
+        self.api = api
+        self.interval = interval
+        self.chunk_rows = chunk_rows
+        self.metrics = metrics  # Optional metrics.Metrics
+
+        self.imported = 0  # Transactions imported by this process
+        self.skipped = 0  # Unreadable rows passed over by this process
+        self.last_sync = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        # A brand-new journal is hydrated before the first checkout can allocate an ID
+        if not journal.counter('transaction_id'):
+            self._sync_logged()
+        self._thread = threading.Thread(target=self._run, name="sheet-reader", daemon=True)
+        self._thread.start()
+
+    def sync(self):
+        """Import rows appended since the last read; returns the number of new transactions"""
+        with self._lock:
+            sheet = self.get_sheet()
+            if not sheet:
+                raise RuntimeError("No sheet connection")
+            line_sheet = self.get_line_sheet() if self.get_line_sheet else None
+
+            started = time.perf_counter()
+            imported = self._sync_sheets(LOG_ROWS_READ, LINE_ROWS_READ, sheet, line_sheet)
+            if self.partitions:
+                for period in self._periods_to_read():
+                    log_sheet, period_line_sheet = self.partitions.sheets(period, create=False)
+                    imported += self._sync_sheets(
+                        f"{LOG_ROWS_READ}:{period}", f"{LINE_ROWS_READ}:{period}", log_sheet, period_line_sheet
+                    )
+
+            self.imported += imported
+            self.last_sync = time.time()
+            self.last_error = None
+            if self.metrics:
+                self.metrics.observe("sheet_read_seconds", time.perf_counter() - started)
+                self.metrics.inc("sheet_rows_imported_total", imported)
+            return imported
+
+    def _periods_to_read(self):
+        """Never-read partitions plus the most recent ones, which may still be growing"""
+        self.partitions.reload()
+        periods = self.partitions.periods()
+        recent = set(periods[-RECENT_PERIODS:])
+        return [
+            period for period in periods
+            if period in recent or self.journal.counter(f"{LOG_ROWS_READ}:{period}", None) is None
+        ]
+
+    def _sync_sheets(self, log_counter, line_counter, sheet, line_sheet):
+        log_read = self.journal.counter(log_counter)
+        line_read = self.journal.counter(line_counter)
+        lines = self._lines(line_sheet, line_read)
+        imported = skipped = 0
+
+        for chunk in sheet_chunks(sheet, self.api, self.chunk_rows, start=log_read + 2):
+            chunk = [[normalize_id(row[0])] + row[1:] for row in chunk]
+            rows = []
+            for row in chunk:
+                if row[0].isdigit() and _whole(row[2]) is not None and _whole(row[6]) is not None:
+                    rows.append(row)
+                else:
+                    skipped += 1
+            # Every ID in the chunk, so lines of a skipped row do not hold up the line cursor
+            ids = {row[0] for row in chunk}
+            known = self.journal.known_sales(ids)
+            known_ids = {tid for tid, _ in known}
+            grouped, consumed = lines.take(ids)
+            entries = []
+            for row in rows:
+                tid = row[0]
+                if int(tid) >= SERVER_SLOTS:
+                    if tid in known_ids:
+                        continue
+                    known_ids.add(tid)
+                else:
+                    # Per-session IDs from before server numbers: only the same ID and time is the same sale
+                    if (tid, str(row[1])) in known:
+                        continue
+                    known.add((tid, str(row[1])))
+                entries.append((self._transaction(row, grouped.get(tid)), [str(v) for v in row]))
+            log_read += len(chunk)
+            line_read += consumed
+            self.journal.import_synced(entries, {log_counter: log_read, line_counter: line_read})
+            imported += len(entries)
+        if self.journal.counter(log_counter, None) is None:
+            # Record an empty tab as read so it is not treated as new on every pass
+            self.journal.import_synced([], {log_counter: 0, line_counter: 0})
+        if skipped:
+            self.skipped += skipped
+            if self.metrics:
+                self.metrics.inc("sheet_rows_skipped_total", skipped)
+            print(f"WARNING: Skipped {skipped} rows of '{sheet.title}' with a blank or non-numeric ID or amount")
+        return imported
+
+    def _lines(self, line_sheet, line_read):
+        if line_sheet is None:
+            return _LineCursor(iter(()), self.journal)
+        return _LineCursor(
+            sheet_chunks(line_sheet, self.api, self.chunk_rows, start=line_read + 2, width=len(LINE_ITEMS_HEADER)),
+            self.journal
+        )
+
+    def _item(self, item_id, name, price, qty):
+        item = self.catalogue.get(item_id) if self.catalogue and item_id else None
+        if item is None and self.catalogue and name:
+            item = self.catalogue.find(name)
+        if item is not None:
+            item_id = item['id']
+            name = name or item['name']
+            price = item['price'] if price is None else price
+        return {
+            'id': item_id or 0,  # 0: not on the current menu
+            'name': name or f"Item {item_id}",
+            'price': price or 0,
+            'qty': qty,
+        }
+
+    def _transaction(self, row, lines):
+        tid, timestamp, total, _, _, _, paid, _, items_text = row
+        total = _whole(total)
+        paid = _whole(paid)
+        if lines:
+            items = [self._item(int(item_id), None, int(price), int(qty)) for item_id, price, qty in lines]
+        else:
+            # Rows logged before the line-item tab existed: names and quantities only
+            parsed = parse_items(items_text)
+            items = [self._item(None, name, None, qty) for name, qty in parsed]
+            if len(items) == 1 and items[0]['qty']:
+                items[0]['price'] = total // items[0]['qty']
+        return {
+            'id': int(tid),
+            'time': str(timestamp),
+            'items': items,
+            'total': total,
+            'amount_paid': paid,
+            'change': paid - total,
+        }
+
+    def _sync_logged(self):
+        try:
+            self.sync()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"INTERNAL ERROR: Sheet history sync failed - {str(e)}")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sync_logged()
+
+    def close(self):
+        self._stopped.set()
+
+
+class _LineCursor:
+    """Walks the line-item tab in step with the log tab
+
+    Both tabs are appended by the same batchUpdate, so lines for a chunk of log
+    rows come before lines of any later row. Lines of transactions already
+    journaled are skipped; the cursor stops at the first line of a transaction
+    not yet read from the log tab.
+    """
+
+    def __init__(self, chunks, journal):
+        self._chunks = chunks
+        self._journal = journal
+        self._pending = deque()  # (tid, item_id, unit_price, qty, already journaled)
+
+    def _fill(self):
+        chunk = next(self._chunks, None)
+        if not chunk:
+            return False
+        known = self._journal.known_ids({str(line[0]) for line in chunk})
+        self._pending.extend((str(tid), item_id, price, qty, str(tid) in known)
+                             for tid, item_id, price, qty in chunk)
+        return True
+
+    def take(self, ids):
+        """Lines for the given transaction IDs, as {tid: [(item_id, price, qty)]}, and lines consumed"""
+        grouped = {}
+        consumed = 0
+        while self._pending or self._fill():
+            tid, item_id, price, qty, known = self._pending[0]
+            if tid in ids:
+                grouped.setdefault(tid, []).append((item_id, price, qty))
+            elif not known:
+                break
+            self._pending.popleft()
+            consumed += 1
+        return grouped, consumed
@@ -0,0 +1,107 @@
+import atexit
+import threading
+import time
+import uuid
+
+
+class SheetWriter:
+    """Background replicator that ships unsynced journal rows to the log backend in batches
+
+    All sessions in the process journal into the same table and share this one
+    writer, so rows from every register are coalesced into a single request.
+    Writers in other processes sharing the journal file claim rows before
+    sending them, so each row is sent once.
+    """
+
+    def __init__(self, journal, backend, batch_size=20, max_batch_rows=500, flush_interval=2.0,
+                 retry_delay=5.0, claim_lease=300.0, metrics=None):
+        self.journal = journal
+        self.backend = backend  # A backends.LogBackend
+        self.metrics = metrics  # Optional metrics.Metrics
+        self.batch_size = batch_size  # Pending rows that trigger an early flush
+        self.max_batch_rows = max_batch_rows  # Upper bound on rows per backend append
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.claim_lease = claim_lease  # Seconds other writers wait before retrying rows this one claimed
+        self.owner = uuid.uuid4().hex  # Claims rows in a journal shared with other processes
+
+        self._submitted = 0  # Rows journaled since the last flush
+        self.last_sync = None  # Wall-clock time of the last successful append
+        self.last_latency = None  # Seconds taken by the last backend append
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._flush_now = threading.Event()
+        self._stopped = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self):
+        """Tell the worker a new row was journaled; returns immediately"""
+        with self._lock:
+            self._submitted += 1
+            if self._submitted >= self.batch_size:
+                self._flush_now.set()
+
+    def depth(self):
+        """Number of journaled rows not yet written to the backend"""
+        return self.journal.unsynced_count()
+
+    def flush(self, timeout=None):
+        """Ask the worker to write now and wait until the journal is caught up"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._flush_now.set()
+        while self.depth() and self._thread.is_alive():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return self.depth() == 0
+
+    def close(self, timeout=10):
+        """Try to drain remaining rows and stop the worker"""
+        if self._stopped.is_set():
+            return
+        self.flush(timeout)
+        self._stopped.set()
+        self._flush_now.set()
+
+    def _replicate(self):
+        while True:
+            rows = self.journal.claim(self.owner, self.max_batch_rows, self.claim_lease)
+            if not rows:
+                return
+            started = time.perf_counter()
+            try:
+                self.backend.append(
+                    [row for _, row, _ in rows],
+                    [line for _, _, item_lines in rows for line in item_lines]
+                )
+            except Exception:
+                self.journal.release([seq for seq, _, _ in rows])
+                raise
+            self.last_latency = time.perf_counter() - started
+            if self.metrics:
+                self.metrics.observe("log_append_seconds", self.last_latency, backend=self.backend.name)
+                self.metrics.inc("log_rows_total", len(rows), backend=self.backend.name)
+            self.last_sync = time.time()
+            self.last_error = None
+            # Only mark rows once the backend has accepted them
+            self.journal.mark_synced([seq for seq, _, _ in rows])
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._flush_now.wait(self.flush_interval)
+            self._flush_now.clear()
+            with self._lock:
+                self._submitted = 0
+
+            try:
+                self._replicate()
+            except Exception as e:
+                self.last_error = str(e)
+                if self.metrics:
+                    self.metrics.inc("log_append_errors_total", backend=self.backend.name)
+                print(f"INTERNAL ERROR: {self.backend.name} replication failed ({self.depth()} rows pending) - {str(e)}")
+                self.backend.invalidate(e)
+                self._stopped.wait(self.retry_delay)
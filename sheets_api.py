@@ -0,0 +1,177 @@
+import datetime
+import random
+import threading
+import time
+
+import gspread
+from google.auth.transport.requests import Request
+
+
+class TokenBucket:
+    """Thread-safe token bucket; one token per API request"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute // 6)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_retryable(exception):
+    """Quota (429) and server-side (5xx) errors are worth retrying"""
+    if isinstance(exception, gspread.exceptions.APIError):
+        status = exception.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+def service_account_info(sa_info):
+    """Service account fields from secrets, with the private key cleaned up for signing"""
+    private_key = sa_info['private_key']
+    
+    # Perbaikan khusus untuk masalah JWT Signature:
+    # 1. Pastikan tidak ada spasi tambahan
+    private_key = private_key.strip()
+    
+    # 2. Ganti semua \\n dengan newline sebenarnya
+    private_key = private_key.replace('\\n', '\n')
+    
+    # 3. Hilangkan kutipan tambahan jika ada
+    if private_key.startswith('"') and private_key.endswith('"'):
+        private_key = private_key[1:-1]
+    
+    return {
+        "type": sa_info["type"],
+        "project_id": sa_info["project_id"],
+        "private_key_id": sa_info["private_key_id"],
+        "private_key": private_key,
+        "client_email": sa_info["client_email"],
+        "client_id": sa_info["client_id"],
+        "auth_uri": sa_info["auth_uri"],
+        "token_uri": sa_info["token_uri"],
+        "auth_provider_x509_cert_url": sa_info["auth_provider_x509_cert_url"],
+        "client_x509_cert_url": sa_info["client_x509_cert_url"]
+    }
+
+
+class SheetsApi:
+    """Shared gate for Google Sheets calls: request budget plus jittered exponential backoff"""
+
+    def __init__(self, requests_per_minute=60, max_retries=5, base_delay=1.0, max_delay=32.0, metrics=None):
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics  # Optional metrics.Metrics; records per-operation latency
+        self.throttled = 0  # Retryable errors seen so far
+
+    def _record(self, operation, waited, started):
+        if self.metrics:
+            self.metrics.observe("sheets_api_budget_wait_seconds", started - waited)
+            self.metrics.observe("sheets_api_seconds", time.perf_counter() - started, operation=operation)
+
+    def call(self, fn, *args, **kwargs):
+        """Run one API call within budget, retrying quota and server errors"""
+        operation = getattr(fn, '__name__', 'call')
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._record(operation, waited, started)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    if self.metrics:
+                        self.metrics.inc("sheets_api_errors_total", operation=operation)
+                    raise
+                self.throttled += 1
+                if self.metrics:
+                    self.metrics.inc("sheets_api_retries_total", operation=operation)
+                # Full jitter keeps registers from retrying in lockstep
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+                attempt += 1
+            else:
+                self._record(operation, waited, started)
+                return result
+
+
+class TokenRefresher:
+    """Keeps OAuth credentials valid by refreshing them in the background ahead of expiry
+
+    The first refresh starts immediately, so the token is usually ready before
+    the first Sheets request needs it.
+    """
+
+    def __init__(self, credentials, margin=300.0, retry_delay=30.0, metrics=None):
+        self.credentials = credentials
+        self.margin = margin  # Seconds before expiry to refresh
+        self.retry_delay = retry_delay
+        self.metrics = metrics  # Optional metrics.Metrics
+        self.last_refresh = None  # Wall-clock time of the last successful refresh
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    @property
+    def expiry(self):
+        """Access token expiry as naive UTC, like google-auth; None before the first refresh"""
+        return self.credentials.expiry if self.credentials.token else None
+
+    def refresh(self):
+        """Fetch a new access token now; raises on failure"""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                self.credentials.refresh(Request())
+            except Exception as e:
+                self.last_error = str(e)
+                if self.metrics:
+                    self.metrics.inc("sheets_token_refresh_errors_total")
+                raise
+            self.last_refresh = time.time()
+            self.last_error = None
+            if self.metrics:
+                self.metrics.observe("sheets_token_refresh_seconds", time.perf_counter() - started)
+
+    def refresh_soon(self):
+        """Ask the worker to refresh without waiting for the expiry margin (e.g. after a 401)"""
+        self._wake.set()
+
+    def _seconds_until_due(self):
+        expiry = self.expiry
+        if expiry is None:
+            return 0.0
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds() - self.margin
+
+    def _run(self):
+        while True:
+            self._wake.wait(max(0.0, self._seconds_until_due()))
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"INTERNAL ERROR: Google token refresh failed - {str(e)}")
+                self._wake.wait(self.retry_delay)
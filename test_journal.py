@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from journal import SERVER_SLOTS, Journal
+
+
+def sale(journal):
+    """Journal one sale under a freshly allocated ID; returns (seq, id)"""
+    tid = journal.next_transaction_id()
+    seq = journal.append(
+        {'id': tid, 'time': "2026-10-17 10:00:00", 'items': [], 'total': 5000, 'amount_paid': 5000, 'change': 0},
+        [str(tid), "2026-10-17 10:00:00", "5000", "5000", "5000", "5000", "5000", "1", ""]
+    )
+    return seq, tid
+
+
+@pytest.mark.parametrize("method", ["mark_synced", "release"])
+def test_locked_update_rolls_back(tmp_path, method):
+    journal = Journal(str(tmp_path / "journal.db"))
+    seq, _ = sale(journal)
+    journal._conn.execute("PRAGMA busy_timeout=0")
+
+    # Another process holds the write lock
+    blocker = sqlite3.connect(str(tmp_path / "journal.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        getattr(journal, method)([seq])
+    blocker.execute("ROLLBACK")
+
+    # The shared connection is not left inside a transaction
+    assert not journal._conn.in_transaction
+    sale(journal)
+    journal.mark_synced([seq])
+    assert journal.synced_count() == 1
+
+
+def test_ids_unique_across_instances(tmp_path):
+    path = str(tmp_path / "journal.db")
+    first, second = Journal(path), Journal(path)
+    ids = [journal.next_transaction_id() for _ in range(50) for journal in (first, second)]
+    assert len(set(ids)) == len(ids)
+    assert first.server_id == second.server_id
+
+
+def test_claim_is_exclusive(tmp_path):
+    path = str(tmp_path / "journal.db")
+    first, second = Journal(path), Journal(path)
+    seqs = [sale(first)[0] for _ in range(5)]
+
+    claimed = [seq for seq, _, _ in first.claim("a", limit=3)]
+    assert claimed == seqs[:3]
+    assert [seq for seq, _, _ in second.claim("b")] == seqs[3:]
+    assert second.claim("c") == []
+
+    # Released rows can be claimed again; synced ones never are
+    first.release(claimed[:1])
+    first.mark_synced(claimed[1:])
+    assert [seq for seq, _, _ in second.claim("c")] == claimed[:1]
+
+
+def test_claim_lease_expires(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    seq, _ = sale(journal)
+    assert [s for s, _, _ in journal.claim("a", lease=-1)] == [seq]
+    assert [s for s, _, _ in journal.claim("b")] == [seq]
+
+
+def test_import_raises_sequence_past_imported_ids(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"), server_id=7)
+    imported = 41 * SERVER_SLOTS + 3  # Sale 41 of server 3
+    journal.import_synced([(
+        {'id': imported, 'time': "2026-10-17 10:00:00", 'items': [], 'total': 1, 'amount_paid': 1, 'change': 0},
+        [str(imported)] + [""] * 8
+    )], {})
+    assert journal.counter('transaction_id') == 41
+    assert journal.next_transaction_id() == 42 * SERVER_SLOTS + 7
+
+
+def test_random_server_id_warns_once(tmp_path, capsys):
+    path = str(tmp_path / "journal.db")
+    first = Journal(path)
+    assert f"picked {first.server_id} at random" in capsys.readouterr().out
+    # The pick is stored; reopening the journal keeps it without warning again
+    assert Journal(path).server_id == first.server_id
+    assert "WARNING" not in capsys.readouterr().out
+    Journal(str(tmp_path / "configured.db"), server_id=3)
+    assert "WARNING" not in capsys.readouterr().out
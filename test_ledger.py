@@ -0,0 +1,21 @@
+import random
+
+import numpy as np
+
+from ledger import TransactionFrame
+
+
+def test_time_order_with_out_of_order_rows():
+    frame = TransactionFrame(capacity=4)
+    rng = random.Random(0)
+    times = []
+    for i in range(1, 1001):
+        time = f"2026-10-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+        frame.append({'id': i, 'seq': i, 'time': time, 'items': [], 'total': i, 'amount_paid': i, 'change': 0})
+        times.append(time)
+        if i % 50 == 0:
+            # The cached order is extended in place and must match a full stable sort
+            expected = np.argsort(np.array(times, dtype='datetime64[s]'), kind='stable')
+            assert frame.page(0, i, newest_first=False).index.tolist() == expected.tolist()
+            in_range = [p for p in expected if "2026-10-05 00:00:00" <= times[p] <= "2026-10-09 23:00:00"]
+            assert frame.filter(start="2026-10-05T00:00:00", end="2026-10-09T23:00:00").tolist() == in_range
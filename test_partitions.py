@@ -0,0 +1,27 @@
+from backends import LINE_ITEMS_HEADER, LOG_HEADER
+from fake_sheets import FakeClient
+from partitions import INDEX_HEADER, INDEX_SHEET, SheetPartitions
+
+
+def test_created_tabs_start_with_their_header():
+    spreadsheet = FakeClient().create("POS Transactions")
+    log_sheet, line_sheet = SheetPartitions(lambda: spreadsheet).sheets("2026-10")
+    assert log_sheet.get_all_values()[0] == LOG_HEADER
+    assert line_sheet.get_all_values()[0] == LINE_ITEMS_HEADER
+    assert spreadsheet.worksheet(INDEX_SHEET).get_all_values()[0] == INDEX_HEADER
+
+
+def test_headers_restored_on_tabs_left_without_one():
+    spreadsheet = FakeClient().create("POS Transactions")
+    # A crash after creating the tabs, before their header rows were written
+    spreadsheet.add_worksheet(INDEX_SHEET).append_row(["2026-09", "Log 2026-09", "Line Items 2026-09", ""])
+    log_sheet = spreadsheet.add_worksheet("Log 2026-10")
+    log_sheet.append_row(["1001", "2026-10-01 09:00:00"])
+    spreadsheet.add_worksheet("Line Items 2026-10")
+
+    partitions = SheetPartitions(lambda: spreadsheet)
+    assert partitions.periods() == ["2026-09"]
+    partitions.sheets("2026-10")
+    assert log_sheet.get_all_values()[:2] == [LOG_HEADER, ["1001", "2026-10-01 09:00:00"]]
+    assert spreadsheet.worksheet("Line Items 2026-10").get_all_values() == [LINE_ITEMS_HEADER]
+    assert spreadsheet.worksheet(INDEX_SHEET).get_all_values()[0] == INDEX_HEADER
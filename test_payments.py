@@ -0,0 +1,90 @@
+from functools import lru_cache
+
+import pytest
+
+from payments import CHANGE_DENOMINATIONS, DENOMINATIONS, ChangeMaker, payment_options, payment_options_batch
+
+CUSTOM_DENOMINATIONS = (500, 1000, 5000, 20000, 75000)
+TOTALS = [*range(0, 200001, 100), 1, 499, 501, 9999, 10001, 29999, 30001, 69999, 70001, 123456, 999999]
+
+
+def baseline_options(total, denominations=DENOMINATIONS):
+    """The original scalar rules from app.py, kept as the reference"""
+    options = []
+
+    min_option = next((d for d in sorted(denominations) if d >= total), total + 1000)
+    options.append(min_option)
+
+    if total <= 30000:
+        large_option = 50000
+    elif total <= 70000:
+        large_option = 100000
+    else:
+        large_option = ((total // 50000) + 1) * 50000
+    options.append(large_option)
+
+    if total < 10000:
+        mid_option = round(total / 500) * 500
+        if mid_option <= total:
+            mid_option += 500
+    elif total < 50000:
+        mid_option = ((total // 5000) + 1) * 5000
+    else:
+        mid_option = ((total // 10000) + 1) * 10000
+    options.append(mid_option)
+
+    unique_options = sorted(set(options))
+    while len(unique_options) < 3:
+        if total < 30000:
+            new_option = unique_options[-1] + 5000
+        else:
+            new_option = unique_options[-1] + 10000
+        unique_options.append(new_option)
+    return sorted(unique_options[:3])
+
+
+@pytest.mark.parametrize("denominations", [DENOMINATIONS, CUSTOM_DENOMINATIONS])
+def test_payment_options_match_baseline(denominations):
+    for total in TOTALS:
+        assert payment_options(total, denominations) == baseline_options(total, denominations), total
+
+
+@pytest.mark.parametrize("denominations", [DENOMINATIONS, CUSTOM_DENOMINATIONS])
+def test_payment_options_batch_matches_baseline(denominations):
+    batch = payment_options_batch(TOTALS, denominations)
+    assert batch.shape == (len(TOTALS), 3)
+    for total, row in zip(TOTALS, batch.tolist()):
+        assert row == baseline_options(total, denominations), total
+
+
+def brute_force_notes(amount, denominations):
+    """Fewest pieces making up amount by plain recursion, or None"""
+    @lru_cache(maxsize=None)
+    def fewest(rest):
+        if rest == 0:
+            return 0
+        best = None
+        for denomination in denominations:
+            if denomination <= rest:
+                count = fewest(rest - denomination)
+                if count is not None and (best is None or count + 1 < best):
+                    best = count + 1
+        return best
+
+    return fewest(amount)
+
+
+# (2000, 5000, 10000) cannot make 1000 or 3000, among others
+@pytest.mark.parametrize("denominations", [CHANGE_DENOMINATIONS, (100, 300, 400), (2000, 5000, 10000)])
+def test_change_maker_matches_brute_force(denominations):
+    unit = 100
+    change_maker = ChangeMaker(denominations, max_amount=40000)
+    for amount in range(0, change_maker.max_amount + 1, unit):
+        expected = brute_force_notes(amount, tuple(sorted(denominations)))
+        assert change_maker.notes(amount) == expected, amount
+        pieces = change_maker.breakdown(amount)
+        if expected is None:
+            assert pieces == []
+        else:
+            assert sum(d * n for d, n in pieces) == amount
+            assert sum(n for _, n in pieces) == expected
@@ -0,0 +1,46 @@
+from backends import LOG_HEADER
+from fake_sheets import FakeClient
+from journal import SERVER_SLOTS, Journal
+from sheet_reader import SheetReader
+
+
+def log_row(tid, timestamp, total=5000, paid=5000):
+    return [tid, timestamp, total, 5000, 10000, 20000, paid, 1, "Iced Tea x 1"]
+
+
+def read(tmp_path, rows):
+    sheet = FakeClient().create("POS Transactions").sheet1
+    sheet.append_rows([LOG_HEADER] + rows)
+    journal = Journal(str(tmp_path / "journal.db"))
+    reader = SheetReader(journal, lambda: sheet, interval=3600)
+    reader.close()
+    return journal, reader
+
+
+def test_repeated_legacy_ids_are_all_imported(tmp_path):
+    journal, reader = read(tmp_path, [
+        log_row(1, "2026-10-01 09:00:00"),
+        log_row(1, "2026-10-02 09:00:00"),
+        log_row(2, "2026-10-02 09:05:00"),
+        log_row(2, "2026-10-02 09:05:00"),  # Same ID and time: the same sale logged twice
+        log_row(3 * SERVER_SLOTS + 4, "2026-10-03 09:00:00"),
+        log_row(3 * SERVER_SLOTS + 4, "2026-10-03 09:01:00"),  # Per-server IDs are unique
+    ])
+    assert reader.imported == 4
+    assert sorted(tid for _, tid, _ in journal.ids()) == ["1", "1", "2", str(3 * SERVER_SLOTS + 4)]
+
+
+def test_unreadable_rows_are_skipped(tmp_path):
+    journal, reader = read(tmp_path, [
+        log_row(1.0, "2026-10-01 09:00:00", total=5000.0),  # Typed in by hand
+        ["", "", "", "", "", "", "", "", ""],
+        log_row("refund", "2026-10-01 09:10:00"),
+        log_row(2, "2026-10-01 09:20:00", total=""),
+        log_row(3, "2026-10-01 09:30:00", paid="cash"),
+        log_row(4, "2026-10-01 09:40:00"),
+    ])
+    assert reader.imported == 2
+    assert reader.skipped == 4
+    assert sorted(tid for _, tid, _ in journal.ids()) == ["1", "4"]
+    # The read mark moves past the skipped rows, so they are not read again
+    assert journal.counter("sheet_log_rows_read") == 6